@@ -22,16 +22,19 @@ eventsArray[: , 0] = eventIdx
 
 
 #make epochs object from events
-tmin = -0.1
+#tmin must leave room for the 100 ms pre-saccadic slope window before the saccade at t=0, plus one sample by which saccades are extended
+tmin = -0.11
 tmax = 0.2
 epochs = mne.Epochs(raw, events=eventsArray, 
                     tmin = tmin, tmax=tmax, baseline=None, 
                     reject_by_annotation=True)
 
 #correct epoch using snipandstitch functionality
+#because every saccade starts an epoch, epochs overlap heavily. sharedEstimation=True estimates each saccade only once for all epochs that contain it
 epochs_sns = ssFunc.SnipAndStitch_MNEEpochs(epochs=epochs, channel = 'pupil_right', 
                                             interpolateDPup = True, residualErrorCorrection=False, 
-                                            onNoSaccades = 'raise', match='saccade', inplace=False)
+                                            onNoSaccades = 'raise', match='saccade', inplace=False,
+                                            sharedEstimation=True)
 
 #get the annotations from the epochs object again to plot saccade durations inside epochs
 #this latter list of annotations also no longer includes blinks, as these have been removed due to reject_by_annotation=True
@@ -4,4 +4,7 @@ setup(
      version="1.0.0",
      python_requires=">=3.6",   
      packages=find_packages(),
+     entry_points={
+          "console_scripts": ["snipandstitch-batch=snipandstitch.Batch:main"],
+     },
 )
@@ -0,0 +1,211 @@
+"""Command-line batch runner for snip-and-stitch correction of many MNE recordings, part of the 'snipandstitch' package.
+
+A manifest (JSON) lists the recordings to be corrected:
+
+    {
+        "settings": {"channel": "pupil_right", "interpolateDPup": true},
+        "recordings": [
+            {"id": "sub-01", "input": "sub-01_raw.fif", "output": "corrected/sub-01_raw.fif"},
+            {"id": "sub-02", "input": "sub-02-epo.fif", "output": "corrected/sub-02-epo.fif", "type": "epochs",
+             "settings": {"residualErrorCorrection": true}}
+        ]
+    }
+
+'settings' at the top level are defaults for every recording, and are updated by the 'settings' of a recording.
+Settings are passed as keyword arguments to Functions.SnipAndStitch_MNERaw or Functions.SnipAndStitch_MNEEpochs.
+'type' is 'raw' or 'epochs', and is derived from the input file name if not given.
+Relative paths are relative to the folder of the manifest.
+
+Outputs are written atomically. Every finished recording is appended to a journal, so that a rerun skips completed recordings.
+A recording is only skipped if its input, output, type and settings are unchanged since it was completed.
+
+usage:
+    snipandstitch-batch manifest.json --workers 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def LoadManifest(manifestPath):
+    """Read a manifest and return the list of recordings to be processed.
+    Args:
+        manifestPath: string, path to the JSON manifest
+    Returns:
+        list of dicts with keys 'id', 'input', 'output', 'type' and 'settings'
+    """
+    with open(manifestPath) as f:
+        manifest = json.load(f)
+
+    root = os.path.dirname(os.path.abspath(manifestPath))
+    defaults = manifest.get('settings', {})
+
+    items = []
+    for i, recording in enumerate(manifest['recordings']):
+        settings = dict(defaults)
+        settings.update(recording.get('settings', {}))
+        if 'channel' not in settings:
+            raise ValueError(f"no 'channel' setting given for recording {i} in manifest {manifestPath}")
+
+        inputPath = os.path.join(root, recording['input'])
+        recordingType = recording.get('type', 'epochs' if _IsEpochsFile(inputPath) else 'raw')
+        if recordingType not in ('raw', 'epochs'):
+            raise ValueError(f"type of recording {i} must be 'raw' or 'epochs', but {recordingType} was provided")
+
+        items.append({'id': str(recording.get('id', recording['input'])),
+                      'input': inputPath,
+                      'output': os.path.join(root, recording['output']),
+                      'type': recordingType,
+                      'settings': settings})
+
+    ids = [item['id'] for item in items]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"recording ids in manifest {manifestPath} must be unique")
+    return items
+
+def ReadJournal(journalPath):
+    """Return the recordings that were completed according to a journal.
+    Args:
+        journalPath: string, path to the journal
+    Returns:
+        dict mapping the id of each completed recording to the hash of its input, output, type and settings (see RecordingHash)
+    """
+    completed = {}
+    if not os.path.exists(journalPath):
+        return completed
+
+    with open(journalPath) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue #a line that was being written during a crash
+            if entry.get('status') == 'done' and os.path.exists(entry.get('output', '')):
+                completed[entry['id']] = entry.get('hash')
+    return completed
+
+def RecordingHash(item):
+    """Return a hash of the input, output, type and settings of a recording, as listed by LoadManifest.
+    Args:
+        item: dict with keys 'input', 'output', 'type' and 'settings'
+    Returns:
+        string, hexadecimal hash
+    """
+    key = json.dumps([item['input'], item['output'], item['type'], item['settings']], sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def RunBatch(manifestPath, workers = 1, journalPath = None, resume = True):
+    """Correct all recordings in a manifest, skipping recordings that were completed in an earlier run.
+    Args:
+        manifestPath: string, path to the JSON manifest
+        workers: int, number of worker processes. 1 to process recordings in this process
+        journalPath: string or None, path to the checkpoint journal. None for '<manifestPath>.journal'
+        resume: bool, whether to skip recordings that are listed as completed in the journal with the same input, output, type and settings
+    Returns:
+        list of dicts with keys 'id', 'status' ('done', 'skipped' or 'failed'), 'seconds' and 'error'
+    """
+    if journalPath is None:
+        journalPath = manifestPath + '.journal'
+
+    items = LoadManifest(manifestPath)
+    completed = ReadJournal(journalPath) if resume else {}
+
+    #a recording is only skipped if it was completed with the current input, output, type and settings
+    isDone = lambda item: item['id'] in completed and completed[item['id']] == RecordingHash(item)
+    results = [{'id': item['id'], 'status': 'skipped', 'seconds': 0.0, 'error': None} for item in items if isDone(item)]
+    todo = [item for item in items if not isDone(item)]
+
+    with open(journalPath, 'a') as journal:
+        if workers is None or workers <= 1:
+            for item in todo:
+                results.append(_Finish(item, _Run(item), journal))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(_Run, item): item for item in todo}
+                for future in as_completed(futures):
+                    results.append(_Finish(futures[future], future.result(), journal))
+
+    _Report(results)
+    return results
+
+def main(argv = None):
+    """Entry point of the snipandstitch-batch console script."""
+    parser = argparse.ArgumentParser(prog='snipandstitch-batch', description='Apply snipandstitch correction to all recordings in a manifest.')
+    parser.add_argument('manifest', help='path to the JSON manifest')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes (default: 1)')
+    parser.add_argument('--journal', default=None, help='path to the checkpoint journal (default: <manifest>.journal)')
+    parser.add_argument('--no-resume', action='store_true', help='process all recordings, also those completed in an earlier run')
+    args = parser.parse_args(argv)
+
+    results = RunBatch(args.manifest, workers=args.workers, journalPath=args.journal, resume=not args.no_resume)
+    return 1 if any(r['status'] == 'failed' for r in results) else 0
+
+def _IsEpochsFile(path):
+    """Return whether a file name follows the mne naming convention for Epochs."""
+    name = os.path.basename(path)
+    for ending in ('.fif', '.fif.gz'):
+        if name.endswith(ending):
+            name = name[:-len(ending)]
+    return name.endswith('-epo') or name.endswith('_epo')
+
+def _Run(item):
+    """Correct one recording and write it atomically. Returns a dict with 'seconds' and 'error'.
+    Runs in a worker process, so that errors are returned instead of raised.
+    """
+    t0 = time.perf_counter()
+    try:
+        import mne
+        from . import Functions
+
+        if item['type'] == 'raw':
+            inst = mne.io.read_raw(item['input'], preload=True)
+            inst = Functions.SnipAndStitch_MNERaw(inst, inplace=True, **item['settings'])
+        else:
+            inst = mne.read_epochs(item['input'], preload=True)
+            inst = Functions.SnipAndStitch_MNEEpochs(inst, inplace=True, **item['settings'])
+
+        #write to a temporary file next to the output, then move it in place in one step
+        folder, name = os.path.split(item['output'])
+        os.makedirs(folder or '.', exist_ok=True)
+        tmpPath = os.path.join(folder, f".tmp-{os.getpid()}-{name}")
+        try:
+            inst.save(tmpPath, overwrite=True)
+            os.replace(tmpPath, item['output'])
+        finally:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+    except Exception as e:
+        return {'seconds': time.perf_counter() - t0, 'error': f"{type(e).__name__}: {e}"}
+
+    return {'seconds': time.perf_counter() - t0, 'error': None}
+
+def _Finish(item, outcome, journal):
+    """Append the outcome of one recording to the journal and return its result."""
+    status = 'failed' if outcome['error'] else 'done'
+    entry = {'id': item['id'], 'output': item['output'], 'hash': RecordingHash(item), 'status': status, 'seconds': outcome['seconds'], 'error': outcome['error']}
+
+    journal.write(json.dumps(entry) + '\n')
+    journal.flush()
+    os.fsync(journal.fileno())
+
+    if outcome['error']:
+        print(f"Warning: recording {item['id']} failed: {outcome['error']}")
+    return {'id': item['id'], 'status': status, 'seconds': outcome['seconds'], 'error': outcome['error']}
+
+def _Report(results):
+    """Print the status and processing time of every recording."""
+    width = max([len(r['id']) for r in results] + [2])
+    print(f"{'id'.ljust(width)}  {'status':<8}  seconds")
+    for r in results:
+        print(f"{r['id'].ljust(width)}  {r['status']:<8}  {r['seconds']:.2f}")
+
+    counts = {status: sum(r['status'] == status for r in results) for status in ('done', 'skipped', 'failed')}
+    total = sum(r['seconds'] for r in results)
+    print(f"{counts['done']} done, {counts['skipped']} skipped, {counts['failed']} failed in {total:.2f} s")
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
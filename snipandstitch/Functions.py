@@ -1,6 +1,7 @@
 """Functions for snip-and-stitch correction of saccadic pupil-size artifacts in MNE objects."""
 import numpy as np
-from scipy import stats
+from functools import partial
+from . import _Correction, _Validate, _Detect
 
 def SetLinearCorrection(trials):
     """Correct for linear accumulation of leftover error and return corrected list of Trials  
@@ -10,17 +11,80 @@ def SetLinearCorrection(trials):
     y = np.array([trial.residualCorrection for trial in trials])
     x = np.array([trial.eventCount for trial in trials])
 
+    val = _LinearCorrectionValue(y, x)
+
+    for trial in trials:
+        trial._SetSnipStitchSettings(participantCorrectionValue = val)
+
+def _LinearCorrectionValue(residuals, eventCounts):
+    """Return the per-saccade buildup value, from residual corrections and event counts of trials."""
     # Calculate the slope using the least-squares formula
-    numerator = np.sum(x * y)
-    denominator = np.sum(x ** 2)
+    numerator = np.sum(eventCounts * residuals)
+    denominator = np.sum(eventCounts ** 2)
     val = numerator / denominator
 
     print(f"Linear correction value: {val}")
+    return val
 
-    for trial in trials:
-        trial._SetSnipStitchSettings(participantCorrectionValue = val)
+def ValidateEvents(data, starts, ends, epochIdx = None, samplingRate = None):
+    """Check all (saccade) events at once, before any correction is estimated.
+    Args:
+        data: array of pupil sizes, 1-d for one trial or 2-d with shape (n_epochs, n_times)
+        starts: array of event start indices, relative to their trial
+        ends: array of event end indices, relative to their trial
+        epochIdx: array with the trial index of each event. None if data is 1-d
+        samplingRate: sampling rate in Hz, or None. If given, the pre-saccadic slope windows are checked as well
+    Returns:
+        dict with per-event boolean masks 'unsorted', 'reversed' (end not after start), 'overlapping' (extended event overlaps any other event of its trial), 'outOfWindow' (median or slope window leaves the trial),
+        'nanInWindow' and 'invalid' (any of the former), a per-trial boolean mask 'emptyEpochs', and a 'summary' dict with counts
+    """
+    return _Validate._ValidateEvents(data, starts, ends, epochIdx, samplingRate)
+
+def DetectSaccades(x, y, sfreq, velocityThreshold = None, accelerationThreshold = None, velocityFactor = 6.0, minDuration = 0.012, minInterval = 0.02):
+    """Detect saccades from gaze positions in one vectorized pass.
+    Args:
+        x: array of horizontal gaze positions
+        y: array of vertical gaze positions
+        sfreq: sampling rate in Hz
+        velocityThreshold: float or None, speed threshold in position units/s. None for an adaptive threshold of velocityFactor median-based standard deviations per axis (Engbert & Kliegl, 2003)
+        accelerationThreshold: float or None, samples where the absolute acceleration (units/s^2) exceeds this value are also saccadic
+        velocityFactor: float, multiplier of the adaptive threshold
+        minDuration: float, minimum saccade duration in seconds
+        minInterval: float, saccades separated by a shorter interval (s) are merged
+    Returns:
+        tuple of int arrays (starts, ends), sample indices of saccade on- and offset (ends exclusive). Can be passed as 'saccades' to SnipAndStitch_MNERaw
+    """
+    return _Detect._DetectSaccades(x, y, sfreq, velocityThreshold, accelerationThreshold, velocityFactor, minDuration, minInterval)
+
+def DetectSaccades_MNE(raw, xChannel, yChannel, **kwargs):
+    """Detect saccades from the gaze channels of an MNE Raw object.
+    Args:
+        raw: MNE Raw object
+        xChannel: string, name of the horizontal gaze channel, e.g. 'xpos_right'
+        yChannel: string, name of the vertical gaze channel, e.g. 'ypos_right'
+        kwargs: keyword arguments passed to DetectSaccades
+    Returns:
+        tuple of int arrays (starts, ends), sample indices of saccade on- and offset (ends exclusive). Can be passed as 'saccades' to SnipAndStitch_MNERaw
+    """
+    x, y = raw.get_data(picks=[xChannel, yChannel])
+    return DetectSaccades(x, y, raw.info['sfreq'], **kwargs)
+
+def DetectEvents(trace, samplingRate, **kwargs):
+    """Detect saccades in a trace as used by Trial objects, and return them as Event objects.
+    Args:
+        trace: list of samples, each sample contains x, y, and pupil size
+        samplingRate: sampling rate in Hz
+        kwargs: keyword arguments passed to DetectSaccades
+    Returns:
+        list of Event objects, which can be used to make a Trial object from the same trace
+    """
+    from . import Event
+
+    positions = np.asarray([sample[:2] for sample in trace], dtype=float)
+    starts, ends = DetectSaccades(positions[:, 0], positions[:, 1], samplingRate, **kwargs)
+    return [Event.Event(start=int(start), end=int(end)) for start, end in zip(starts, ends)]
 
-def SnipAndStitch_MNERaw(raw, channel, interpolateDPup = True, match='saccade', inplace=False):
+def SnipAndStitch_MNERaw(raw, channel, interpolateDPup = True, match='saccade', inplace=False, nJobs=1, saccades=None, blinkMatch=None, blinkBuffer=0.0):
     """Snip and stitch MNE raw objects to correct for saccadic pupil-size artifacts.
     Args:
         raw: MNE Raw object
@@ -28,47 +92,50 @@ def SnipAndStitch_MNERaw(raw, channel, interpolateDPup = True, match='saccade',
         interpolateDPup: bool, whether to interpolate dPup when correcting PFE
         match: string, the key to look for when obtaining saccade events from Epochs object
         inplace: bool, whether to apply modifications to and return mne object that was given as 'raw' (True), or to apply edits to a copy thereof (False)
+        nJobs: int, number of threads. If larger than 1, the recording is split into independent segments at saccade-free points, which are corrected in parallel. Output equals the serial result up to floating point rounding
+        saccades: tuple of arrays (starts, ends) or None. Sample indices of saccade on- and offset (e.g. from DetectSaccades_MNE), used instead of annotations matching 'match'
+        blinkMatch: string or None, description of blink annotations (e.g. 'BAD_blink'). If given, blinks (and NaN samples) are linearly interpolated, and excluded from the median and slope windows, in the same pass as the correction.
+                   A saccade with a median window that contains only blink samples is neither corrected nor stitched
+        blinkBuffer: float, time in seconds added before and after each blink annotation
     Returns:
         MNE Raw object, with corrected data in specified channel. If 'inplace', is a reference to provided 'raw' object, edited inplace.
     """
 
-    #obtain all saccade annotations
-    saccAnnots = raw.annotations[raw.annotations.description == match]
-
     raw.load_data()
 
     trace = raw.get_data(picks=channel, return_times=False)[0]
 
+    sfreq = raw.info['sfreq']
+    interpolateWidth = None
     if interpolateDPup:
-        sfreq = raw.info['sfreq']
         interpolateWidth_s = 0.1
         interpolateWidth = int(sfreq * interpolateWidth_s)
 
     extend = 1
     medianWidth = 4
 
-    startIdxs = raw.time_as_index(saccAnnots.onset) - extend
-    endIdxs = raw.time_as_index(saccAnnots.onset+saccAnnots.duration) + extend
-
-    for start, end in zip(startIdxs, endIdxs):
-        
-        #dPFE, estimate of pupil change due to PFE
-        dPFE = np.median(trace[end:end + medianWidth]) - np.median(trace[start - medianWidth:start])
-
-        #do pupil size interpolation if required
-        if interpolateDPup:
-            #slice data
-            interSlice = trace[start-interpolateWidth:start]
-            slope, _, _, p, _ = stats.linregress(range(interpolateWidth), interSlice) #slope in units/sample
-            durSamp = (end - start) / sfreq #event duration in samples
-            #modify PFE estimate
-            dPFE -= slope * durSamp #correct dPFE for slope
-
-        #correct channel values after event
-        trace[end:] -= dPFE
-
-        #interpolate values during event by interpolating between corrected(!) start, and end samples
-        trace[start:end] = np.linspace(trace[start], trace[end], end - start)
+    if saccades is None:
+        #obtain all saccade annotations
+        saccAnnots = raw.annotations[raw.annotations.description == match]
+        startIdxs = raw.time_as_index(saccAnnots.onset) - extend
+        endIdxs = raw.time_as_index(saccAnnots.onset+saccAnnots.duration) + extend
+    else:
+        startIdxs = np.asarray(saccades[0], dtype=int) - extend
+        endIdxs = np.asarray(saccades[1], dtype=int) + extend
+
+    #interpolate blinks, and remember which samples were blinks so that they are not used for estimation
+    blinkMask = None
+    if blinkMatch is not None:
+        blinkAnnots = raw.annotations[raw.annotations.description == blinkMatch]
+        blinkStarts = raw.time_as_index(blinkAnnots.onset - blinkBuffer)
+        blinkEnds = raw.time_as_index(blinkAnnots.onset + blinkAnnots.duration + blinkBuffer)
+        blinkMask = _Correction._BlinkMask(len(trace), blinkStarts, blinkEnds) | np.isnan(trace)
+        _Correction._InterpolateBlinks(trace, blinkMask)
+
+    if nJobs is None or nJobs <= 1:
+        _Correction._SnipStitchTrace(trace, startIdxs, endIdxs, medianWidth, interpolateWidth, sfreq, blinkMask)
+    else:
+        _Correction._SnipStitchTraceParallel(trace, startIdxs, endIdxs, medianWidth, interpolateWidth, sfreq, nJobs=nJobs, blinkMask=blinkMask)
 
     #make clone if requested
     if not inplace:
@@ -78,7 +145,7 @@ def SnipAndStitch_MNERaw(raw, channel, interpolateDPup = True, match='saccade',
     raw._data[raw.ch_names.index(channel)] = trace
     return raw
 
-def SnipAndStitch_MNEEpochs(epochs, channel, interpolateDPup = True, residualErrorCorrection=False, onNoSaccades = 'raise', match='saccade', inplace=False):
+def SnipAndStitch_MNEEpochs(epochs, channel, interpolateDPup = True, residualErrorCorrection=False, onNoSaccades = 'raise', match='saccade', inplace=False, onInvalidEvents = 'keep', sharedEstimation = False, estimationRate = None):
     """Snip and stitch MNE Epochs to correct for saccadic artifacts.
     Args:
         epochs: MNE Epochs object. Importantly, Raw.set_annotations() must have been called before making Epochs with events matching the key provided in 'match' (utilizes mne.Epochs.get_annotations_per_epoch())
@@ -88,6 +155,9 @@ def SnipAndStitch_MNEEpochs(epochs, channel, interpolateDPup = True, residualErr
         onNoSaccades: string, 'raise' or 'skip', how to handle trials without saccades
         match: string, the key to look for when obtaining saccade events from Epochs object
         inplace: bool, whether to apply modifications to and return mne object that was given as 'epochs' (True), or to apply edits to a copy thereof (False)
+        onInvalidEvents: string, 'keep', 'skip' or 'raise', how to handle events that fail validation (see ValidateEvents). All events are validated before any correction is estimated, with the windows of the estimation that is used (per epoch, or on the union of epochs with sharedEstimation)
+        sharedEstimation: bool, whether to estimate each saccade only once on the union of all epoch spans, and derive the correction of each epoch from these shared estimates. Recommended for overlapping epochs. Estimation windows are then only clamped at the edges of the union, not at the edges of each epoch. Requires epochs made with baseline=None and detrend=None
+        estimationRate: float or None, sampling rate in Hz at which saccades are estimated (requires sharedEstimation). If given, median windows span MEDIAN_DURATION ms instead of MEDIAN_WIDTH samples. If lower than the sampling rate of epochs, windows are estimated on a decimated copy (bin averages of sfreq // estimationRate samples), and corrections are applied at full resolution. Recommended for high-rate recordings (e.g. 2000 Hz). SnipAndStitch_MNERaw and Trial objects always estimate at full resolution with MEDIAN_WIDTH samples
     Returns:
         MNE Epochs object, with corrected data in specified channel
     """
@@ -95,6 +165,7 @@ def SnipAndStitch_MNEEpochs(epochs, channel, interpolateDPup = True, residualErr
 
     #ensure one of two options is provided
     assert (onNoSaccades == 'raise' or onNoSaccades == 'skip'), f"onNoSaccades argument must be 'raise' or 'omit', but {onNoSaccades} was provided" 
+    assert onInvalidEvents in ('keep', 'skip', 'raise'), f"onInvalidEvents argument must be 'keep', 'skip' or 'raise', but {onInvalidEvents} was provided"
 
     #cast match to list if one string
     if isinstance(match, str):
@@ -103,10 +174,17 @@ def SnipAndStitch_MNEEpochs(epochs, channel, interpolateDPup = True, residualErr
     else:
         raise Exception(f"match must be of type str, but is type {type(match)}")
     
-    #ensure that epochs have tmin great enough to contain _SnipStitch.INTERPOLATION_WIDTH (if this is not the case, interpolation is not possible)
+    if estimationRate is not None and not sharedEstimation:
+        raise ValueError("estimationRate requires sharedEstimation=True. For non-overlapping epochs, shared estimation equals per-epoch estimation")
+    if estimationRate is not None and not estimationRate > 0:
+        raise ValueError(f"estimationRate must be a positive sampling rate in Hz, but {estimationRate} was provided")
+
+    #ensure that epochs have tmin great enough to contain _SnipStitch.INTERPOLATION_WIDTH before the extended saccade at t=0 (if this is not the case, interpolation is not possible)
     if interpolateDPup:
-        from ._SnipStitch import INTERPOLATION_WIDTH
-        assert -epochs.times[0] * 1000 >= INTERPOLATION_WIDTH, f"epochs use tmin {epochs.times[0]} s which is not enough to contain pre-saccadic interpolation window of {INTERPOLATION_WIDTH/1000} s"
+        from ._SnipStitch import INTERPOLATION_WIDTH, EXTEND_EVENTS
+        sfreq = epochs.info['sfreq']
+        requiredSamples = int(sfreq * INTERPOLATION_WIDTH / 1000) + EXTEND_EVENTS
+        assert -epochs.times[0] * sfreq + 0.5 >= requiredSamples, f"epochs use tmin {epochs.times[0]} s which is not enough to contain pre-saccadic interpolation window of {INTERPOLATION_WIDTH/1000} s plus {EXTEND_EVENTS} sample(s) by which saccades are extended. Use tmin <= {-requiredSamples / sfreq} s"
 
 
     #load epochs data
@@ -120,20 +198,14 @@ def SnipAndStitch_MNEEpochs(epochs, channel, interpolateDPup = True, residualErr
     #copy sfreq to argument for Trial initialisation, set to None if interpolateDPup is set to False to let the Trial object know no interpolation is required
     trial_sfreqArg = sfreq if interpolateDPup else None
 
-    #make a trials list and populate with Trial objects, or None
-    trials = []
-    for trialData, _saccAnnotTup in zip(data, epochs.get_annotations_per_epoch()):
-
+    #collect event sample indices of all epochs, so that they can be validated before any estimation
+    epochIdxs, starts, ends = [], [], []
+    for i, _saccAnnotTup in enumerate(epochs.get_annotations_per_epoch()):
 
         #read all annotations from this epochs' annotations that match match in match (i.e., all provided saccade events)
         _saccAnnotTup = [_sAT for _sAT in _saccAnnotTup if _sAT[2] in match]
 
-        #construct a trace (x and y set to zero because they are not used in this scope)
-        trialTrace = np.zeros([len(trialData), 3]) 
-        trialTrace[:, 2] = trialData #pupil size in 3rd column
-
-        #construct list of Event objects, for each saccade annotation linked to this epoch
-        events = []
+        #for each saccade annotation linked to this epoch, get start and end indices
         for onset, duration, _ in _saccAnnotTup:
 
             #if saccade begins before trial onset (t=0), skip this saccade
@@ -149,33 +221,67 @@ def SnipAndStitch_MNEEpochs(epochs, channel, interpolateDPup = True, residualErr
             o = int(onset * sfreq + 0.5)
             e = int(tEnd * sfreq + 0.5)
 
-            if e > len(trialData):
+            if e > data.shape[1]:
                 continue #skip events that are out of bounds
-            events.append(Event.Event(start=o, end=e))
+            epochIdxs.append(i)
+            starts.append(o)
+            ends.append(e)
+
+    epochIdxs, starts, ends = np.array(epochIdxs, dtype=int), np.array(starts, dtype=int), np.array(ends, dtype=int)
 
-        #if no saccades were succesfully turned into events, do whatever was requested by argument 'onNoSaccades'
-        if len(events) == 0:
-            if onNoSaccades == 'raise':
-                raise ValueError(f"No annotations starting with '{match}' found for one of the epochs. To skip these errors instead of raising, change the 'onNoSaccades' argument to 'skip'")
-            elif onNoSaccades == 'skip':
+    #validate all events at once, with the windows of the estimation that is used
+    if sharedEstimation:
+        epochFirsts, decimation = _SharedLayout(epochs, estimationRate)
+        validation = _Validate._ValidateSharedEvents(data, epochFirsts, starts, ends, epochIdxs, trial_sfreqArg, decimation, sfreq)
+    else:
+        validation = _Validate._ValidateEvents(data, starts, ends, epochIdxs, samplingRate=trial_sfreqArg)
+    keep = np.ones(len(starts), dtype=bool)
+    if validation['summary']['invalid'] > 0:
+        if onInvalidEvents == 'raise':
+            raise ValueError(f"Invalid events found before correction: {validation['summary']}. To skip or keep these events instead of raising, change the 'onInvalidEvents' argument to 'skip' or 'keep'")
+        elif onInvalidEvents == 'skip':
+            print(f"Warning: skipping {validation['summary']['invalid']} invalid events: {validation['summary']}")
+            keep = ~validation['invalid']
+
+    #if no saccades were succesfully turned into events for an epoch, do whatever was requested by argument 'onNoSaccades'
+    noSaccades = np.bincount(epochIdxs[keep], minlength=len(data)) == 0
+    if onNoSaccades == 'raise' and noSaccades.any():
+        raise ValueError(f"No annotations starting with '{match}' found for {noSaccades.sum()} of the epochs (first: epoch {np.argmax(noSaccades)}). To skip these errors instead of raising, change the 'onNoSaccades' argument to 'skip'")
+
+    if sharedEstimation:
+        #estimate each unique saccade once, and derive the correction of each epoch from the shared estimates
+        data = _CorrectEpochsShared(data, epochFirsts, epochIdxs[keep], starts[keep], ends[keep], noSaccades, trial_sfreqArg, residualErrorCorrection, decimation, sfreq)
+    else:
+        #make a trials list and populate with Trial objects, or None
+        trials = []
+        for i, trialData in enumerate(data):
+            if noSaccades[i]:
                 trials.append(None)
                 continue
 
-        #make Trial object
-        trial = Trial.Trial(trialTrace, events, samplingRate=trial_sfreqArg)
+            #construct a trace (x and y set to zero because they are not used in this scope)
+            trialTrace = np.zeros([len(trialData), 3]) 
+            trialTrace[:, 2] = trialData #pupil size in 3rd column
 
-        #append to list
-        trials.append(trial)
+            #construct list of Event objects, for each saccade annotation linked to this epoch
+            inEpoch = keep & (epochIdxs == i)
+            events = [Event.Event(start=int(o), end=int(e)) for o, e in zip(starts[inEpoch], ends[inEpoch])]
 
-    #apply our linear error correction if requested
-    if residualErrorCorrection:
-        SetLinearCorrection([t for t in trials if t is not None])
+            #make Trial object
+            trial = Trial.Trial(trialTrace, events, samplingRate=trial_sfreqArg)
 
-    #write back to epochs, first set a np array for all data
-    for i, trial in enumerate(trials):
-        if trial is None:
-            continue
-        data[i, :] = np.array([trial.CorrectedPupsize(j) for j in range(len(trial))])
+            #append to list
+            trials.append(trial)
+
+        #apply our linear error correction if requested
+        if residualErrorCorrection:
+            SetLinearCorrection([t for t in trials if t is not None])
+
+        #write back to epochs, first set a np array for all data
+        for i, trial in enumerate(trials):
+            if trial is None:
+                continue
+            data[i, :] = np.array([trial.CorrectedPupsize(j) for j in range(len(trial))])
 
     #clone epochs object if requested
     if inplace:
@@ -188,37 +294,121 @@ def SnipAndStitch_MNEEpochs(epochs, channel, interpolateDPup = True, residualErr
 
     #return (cloned) epochs object
     return _epochs
-        
-
-
-
-    
-
-
-
-
-
-
-
-
-
-
-    
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
 
+def _SharedLayout(epochs, estimationRate = None):
+    """Return the continuous sample index of the first sample of each epoch, and the decimation factor for shared estimation.
+    Args:
+        epochs: MNE Epochs object
+        estimationRate: float or None, sampling rate in Hz at which saccades are estimated
+    Returns:
+        tuple (epochFirsts, decimation). decimation is None if no estimationRate is given
+    """
+    if getattr(epochs, '_decim', 1) != 1:
+        raise ValueError("sharedEstimation requires epochs that are not decimated")
+    #epochs are laid out on one shared axis, which is only valid if overlapping epochs hold the same values
+    if epochs.baseline is not None or epochs.detrend is not None:
+        raise ValueError(f"sharedEstimation requires epochs without baseline correction or detrending (baseline is {epochs.baseline}, detrend is {epochs.detrend}). "
+                         "Make epochs with baseline=None and detrend=None, and apply a baseline after correction (e.g. epochs.apply_baseline())")
+
+    #continuous sample index of the first sample of each epoch
+    samplingRate = epochs.info['sfreq']
+    epochFirsts = epochs.events[:, 0] + int(round(epochs.times[0] * samplingRate))
+
+    #decimation factor for estimation, if an estimation rate is requested. Windows are then time-based, also for a factor of 1
+    decimation = None if estimationRate is None else max(int(samplingRate // estimationRate), 1)
+    return epochFirsts, decimation
+
+def _CorrectEpochsShared(data, epochFirsts, epochIdxs, starts, ends, noSaccades, sfreq, residualErrorCorrection, decimation = None, samplingRate = None):
+    """Return corrected epochs data, estimating each saccade once for all epochs that contain it.
+    Args:
+        data: numpy array with shape (n_epochs, n_times)
+        epochFirsts: array, continuous sample index of the first sample of each epoch (see _SharedLayout)
+        epochIdxs: array, epoch index of each event
+        starts: array of event start indices, relative to their epoch
+        ends: array of event end indices, relative to their epoch
+        noSaccades: boolean array, epochs that are left uncorrected
+        sfreq: float or None, sampling rate in Hz. None if intra-saccadic pupil size change is not interpolated
+        residualErrorCorrection: bool, whether to apply linear correction for residual error accumulation
+        decimation: int or None, decimation factor for estimation with time-based windows (see _SharedLayout)
+        samplingRate: float, sampling rate of data in Hz. Only required if decimation is given
+    Returns:
+        numpy array with shape (n_epochs, n_times), corrected data
+    """
+    dTot, dPup = _Correction._EstimateSharedSnipStitches(data, epochFirsts, epochIdxs, starts, ends, sfreq, decimation, samplingRate)
+    corrValues = dTot - dPup
 
+    #apply our linear error correction if requested, using the residual correction and event count of each corrected epoch
+    if residualErrorCorrection:
+        corrected = ~noSaccades
+        residuals = np.bincount(epochIdxs, weights=corrValues, minlength=len(data))[corrected]
+        eventCounts = np.bincount(epochIdxs, minlength=len(data))[corrected]
+        corrValues = corrValues - _LinearCorrectionValue(residuals, eventCounts)
+
+    for i in np.nonzero(~noSaccades)[0]:
+        inEpoch = epochIdxs == i
+        data[i, :] = _Correction._ApplySnipStitches(data[i], starts[inEpoch], ends[inEpoch], corrValues[inEpoch], interpolate = sfreq is not None)
+
+    return data
+
+def SnipAndStitch_Lazy(data, saccades, sfreq, interpolateDPup = True, maxSaccadeDuration = 0.2):
+    """Snip and stitch chunked (dask or xarray) arrays lazily, without loading them into memory.
+    Each row along the last axis (time) is corrected as one trial, as in SnipAndStitch_MNEEpochs.
+    The correction is built as a task graph: saccades are estimated per chunk, using halo samples from neighbouring chunks
+    for the pre- and post-saccadic windows, and the cumulative correction is a lazy prefix sum along time.
+    Args:
+        data: dask array or xarray DataArray (e.g. participant x trial x time) of raw pupil sizes, with time on the last axis
+        saccades: boolean array (dask, numpy or xarray) with the shape of data, True during saccades
+        sfreq: float, sampling rate in Hz
+        interpolateDPup: bool, whether to interpolate dPup due to PFE
+        maxSaccadeDuration: float, duration in seconds of the longest saccade. Determines the halo size. Chunks along time that are smaller
+                            than the halo are merged. A longer saccade near a chunk border raises a ValueError when the result is computed
+    Returns:
+        lazy dask array or xarray DataArray (same type as data), with corrected data. Call .compute() to evaluate
+    """
+    try:
+        import dask.array as da
+    except ImportError:
+        raise ImportError("SnipAndStitch_Lazy requires dask. Install it with 'pip install dask'")
+    from . import _SnipStitch
+
+    #unpack xarray objects
+    isDataArray = hasattr(data, 'dims') and hasattr(data, 'data')
+    array = da.asarray(data.data if isDataArray else data)
+    mask = da.asarray(saccades.data if hasattr(saccades, 'dims') else saccades).astype(bool)
+    if mask.shape != array.shape:
+        raise ValueError(f"saccades must have the shape of data {array.shape}, but has shape {mask.shape}")
+
+    #halo: the longest saccade plus the widest window on either side
+    preWidth = _SnipStitch.MEDIAN_WIDTH
+    if interpolateDPup:
+        preWidth = max(preWidth, int(sfreq * _SnipStitch.INTERPOLATION_WIDTH / 1000))
+    depth = int(maxSaccadeDuration * sfreq) + 2 * _SnipStitch.EXTEND_EVENTS + preWidth + _SnipStitch.MEDIAN_WIDTH
+
+    #chunks along time must hold the halo, so smaller chunks are merged into chunks of at least depth samples
+    nTimes = array.shape[-1]
+    if min(array.chunks[-1]) < depth:
+        size = max(depth, max(array.chunks[-1]))
+        nChunks = max(nTimes // size, 1)
+        array = array.rechunk({array.ndim - 1: (size,) * (nChunks - 1) + (nTimes - size * (nChunks - 1),)})
+    mask = mask.rechunk(array.chunks)
+
+    #trials in one chunk along time need no halo
+    if array.numblocks[-1] == 1:
+        depth = 0
+    depths = {axis: 0 for axis in range(array.ndim)}
+    depths[array.ndim - 1] = depth
+
+    #values during saccades, and the correction value of each saccade at its end, are computed per chunk in one pass,
+    #stacked on a new last axis. The halo is trimmed by _LazyBlock, which knows which sides border another chunk
+    blockSfreq = sfreq if interpolateDPup else None
+    parts = da.map_overlap(partial(_Correction._LazyBlock, sfreq=blockSfreq, interpolate=interpolateDPup, depth=depth),
+                           array, mask, depth=depths, boundary='none', trim=False,
+                           new_axis=array.ndim, chunks=array.chunks + ((2,),), dtype=float)
+    stitched, steps = parts[..., 0], parts[..., 1]
+
+    #the cumulative correction is a prefix sum over chunks along time
+    corrected = stitched - da.cumsum(steps, axis=-1)
+
+    if isDataArray:
+        return data.copy(data=corrected)
+    return corrected
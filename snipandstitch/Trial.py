@@ -59,4 +59,36 @@ class Trial(_Trial._T):
             doInterpolate: Bool. Whether to interpolate.
         """
         super()._SetSnipStitchSettings(doInterpolateSlope = doInterpolate)
+
+    def AddEvent(self, event):
+        """Add a (saccade) event to this trial.
+
+        Only the correction of the new event is estimated. Corrections of other events are kept.
+        Raises ValueError if the event does not fit in the trial.
+        
+        Args:
+            event: Event object, relative to this trial
+        """
+        super()._AddEvent(event)
+
+    def RemoveEvent(self, event):
+        """Remove a (saccade) event from this trial.
+        
+        Args:
+            event: Event object of this trial, e.g. from the 'events' property
+        """
+        super()._RemoveEvent(event)
+
+    def ModifyEvent(self, event, start = None, end = None):
+        """Change the start and/or end of a (saccade) event of this trial.
+
+        Only the correction of the modified event is re-estimated. Corrections of other events are kept.
+        Raises ValueError if the new event does not fit in the trial, in which case the event is left unchanged.
+        
+        Args:
+            event: Event object of this trial, e.g. from the 'events' property
+            start: int or None, new start index of the event (relative to the trial). None to keep the current start
+            end: int or None, new end index of the event (relative to the trial). None to keep the current end
+        """
+        super()._ModifyEvent(event, start, end)
     
@@ -0,0 +1,479 @@
+"""This file is part of the 'snipandstitch' package.
+
+This module contains private array-based correction engines used by the functions in Functions.py.
+"""
+import numpy as np
+from scipy import stats
+from concurrent.futures import ThreadPoolExecutor
+from . import _SnipStitch
+
+
+def _SnipStitchTrace(trace, startIdxs, endIdxs, medianWidth, interpolateWidth = None, sfreq = None, blinkMask = None):
+    """Apply snipandstitch to a 1-d trace in place, correcting one saccade after the other.
+
+    Args:
+        trace: 1-d numpy array of pupil sizes, edited in place
+        startIdxs: array of saccade start indices (already extended)
+        endIdxs: array of saccade end indices (already extended)
+        medianWidth: int, number of samples in the pre- and post-saccadic median windows
+        interpolateWidth: int or None, number of samples used to estimate the pre-saccadic slope. None for no interpolation
+        sfreq: float, sampling rate in Hz. Only required if interpolateWidth is given
+        blinkMask: boolean array or None. Samples marked True are excluded from the median and slope windows.
+                   A saccade is skipped, i.e. neither corrected nor stitched, if one of its median windows contains only blink samples
+
+    Returns:
+        float: sum of all corrections that were subtracted after the last saccade
+    """
+    total = 0.0
+
+    for start, end in zip(startIdxs, endIdxs):
+
+        #dPFE, estimate of pupil change due to PFE
+        if blinkMask is None:
+            dPFE = np.median(trace[end:end + medianWidth]) - np.median(trace[start - medianWidth:start])
+        else:
+            after = trace[end:end + medianWidth][~blinkMask[end:end + medianWidth]]
+            before = trace[start - medianWidth:start][~blinkMask[start - medianWidth:start]]
+            if len(after) == 0 or len(before) == 0:
+                print(f"Warning: median window of saccade at samples {start}-{end} contains only blink samples. Saccade is not corrected or stitched.")
+                continue
+            dPFE = np.median(after) - np.median(before)
+
+        #do pupil size interpolation if required
+        if interpolateWidth is not None:
+            #slice data
+            interSlice = trace[start-interpolateWidth:start]
+            if blinkMask is None:
+                slope, _, _, p, _ = stats.linregress(range(interpolateWidth), interSlice) #slope in units/sample
+            else:
+                valid = ~blinkMask[start-interpolateWidth:start]
+                slope = stats.linregress(np.arange(len(interSlice))[valid], interSlice[valid])[0] if valid.sum() >= 2 else 0.0
+            durSamp = (end - start) / sfreq #event duration in samples
+            #modify PFE estimate
+            dPFE -= slope * durSamp #correct dPFE for slope
+
+        #correct channel values after event
+        trace[end:] -= dPFE
+        total += dPFE
+
+        #interpolate values during event by interpolating between corrected(!) start, and end samples
+        trace[start:end] = np.linspace(trace[start], trace[end], end - start)
+
+    return total
+
+def _BlinkMask(nSamples, startIdxs, endIdxs):
+    """Return a boolean array that is True between each pair of start and end indices (end exclusive)."""
+    delta = np.zeros(nSamples + 1, dtype=int)
+    np.add.at(delta, np.clip(startIdxs, 0, nSamples), 1)
+    np.add.at(delta, np.clip(endIdxs, 0, nSamples), -1)
+    return np.cumsum(delta)[:nSamples] > 0
+
+def _InterpolateBlinks(trace, blinkMask):
+    """Linearly interpolate samples marked in blinkMask in place, from the nearest samples outside blinks."""
+    if not blinkMask.any() or blinkMask.all():
+        return
+    idx = np.arange(len(trace))
+    trace[blinkMask] = np.interp(idx[blinkMask], idx[~blinkMask], trace[~blinkMask])
+
+def _SegmentBounds(startIdxs, endIdxs, nSamples, preWidth, postWidth):
+    """Split a recording into segments that can be corrected independently.
+
+    A segment boundary is placed at a saccade-free point where no saccade before the boundary
+    reads or writes samples after it, and no saccade after the boundary reads or writes samples before it.
+
+    Args:
+        startIdxs: array of saccade start indices, in correction order
+        endIdxs: array of saccade end indices, in correction order
+        nSamples: int, length of the recording
+        preWidth: int, number of samples read before each saccade start
+        postWidth: int, number of samples read after each saccade end
+
+    Returns:
+        list of (sampleStart, sampleEnd, saccadeStart, saccadeEnd) tuples, one per segment
+    """
+    nSacc = len(startIdxs)
+    if nSacc == 0:
+        return [(0, nSamples, 0, 0)]
+
+    #first and last sample touched by each saccade
+    lo = np.asarray(startIdxs) - preWidth
+    hi = np.asarray(endIdxs) + postWidth
+
+    #a split before saccade k is possible if all earlier saccades stay left of all later saccades
+    runningMax = np.maximum.accumulate(hi)[:-1]
+    suffixMin = np.minimum.accumulate(lo[::-1])[::-1][1:]
+    candidates = np.nonzero(runningMax <= suffixMin)[0] + 1
+
+    segments = []
+    sampleStart, saccStart = 0, 0
+    for k in candidates:
+        bound = int(suffixMin[k - 1])
+        if bound <= sampleStart or bound >= nSamples:
+            continue
+        segments.append((sampleStart, bound, saccStart, int(k)))
+        sampleStart, saccStart = bound, int(k)
+    segments.append((sampleStart, nSamples, saccStart, nSacc))
+
+    return segments
+
+def _SnipStitchTraceParallel(trace, startIdxs, endIdxs, medianWidth, interpolateWidth = None, sfreq = None, nJobs = 2, blinkMask = None):
+    """Apply snipandstitch to a 1-d trace in place, correcting independent segments in parallel threads.
+
+    The trace is split at saccade-free points (see _SegmentBounds). Each segment is corrected with
+    _SnipStitchTrace as if it were a recording on its own. The corrections of all segments are then
+    combined using a prefix sum, and the cumulative correction of all earlier segments is subtracted
+    from each segment. The result equals that of _SnipStitchTrace up to floating point rounding.
+
+    Args:
+        trace: 1-d numpy array of pupil sizes, edited in place
+        startIdxs: array of saccade start indices (already extended)
+        endIdxs: array of saccade end indices (already extended)
+        medianWidth: int, number of samples in the pre- and post-saccadic median windows
+        interpolateWidth: int or None, number of samples used to estimate the pre-saccadic slope. None for no interpolation
+        sfreq: float, sampling rate in Hz. Only required if interpolateWidth is given
+        nJobs: int, number of threads
+        blinkMask: boolean array or None. Samples marked True are excluded from the median and slope windows
+
+    Returns:
+        float: sum of all corrections that were subtracted after the last saccade
+    """
+    startIdxs = np.asarray(startIdxs)
+    endIdxs = np.asarray(endIdxs)
+
+    preWidth = max(medianWidth, interpolateWidth or 0)
+    postWidth = max(medianWidth, 1)
+    segments = _SegmentBounds(startIdxs, endIdxs, len(trace), preWidth, postWidth)
+
+    #estimate and apply segment-local corrections; segments are non-overlapping views of trace
+    def _CorrectSegment(segment):
+        sampleStart, sampleEnd, saccStart, saccEnd = segment
+        return _SnipStitchTrace(trace[sampleStart:sampleEnd],
+                                startIdxs[saccStart:saccEnd] - sampleStart,
+                                endIdxs[saccStart:saccEnd] - sampleStart,
+                                medianWidth, interpolateWidth, sfreq,
+                                None if blinkMask is None else blinkMask[sampleStart:sampleEnd])
+
+    with ThreadPoolExecutor(max_workers=nJobs) as executor:
+        totals = np.array(list(executor.map(_CorrectSegment, segments)))
+
+        #exclusive prefix sum: the correction accumulated by all segments before each segment
+        offsets = np.concatenate([[0.0], np.cumsum(totals)[:-1]])
+
+        def _ShiftSegment(args):
+            (sampleStart, sampleEnd, _, _), offset = args
+            if offset != 0:
+                trace[sampleStart:sampleEnd] -= offset
+
+        list(executor.map(_ShiftSegment, zip(segments, offsets)))
+
+    return float(np.sum(totals))
+
+def _EstimateSnipStitches(trace, starts, ends, sfreq = None, lo = None, hi = None):
+    """Estimate the parameters of SnipStitch objects for many events at once.
+
+    Equals the estimates of SnipStitch (sfreq None) or SnipStitchSRate objects, including
+    the clamping of window indices to the bounds of the trial.
+
+    Args:
+        trace: 1-d numpy array of raw pupil sizes
+        starts: array of event start indices (not extended)
+        ends: array of event end indices (not extended)
+        sfreq: float or None, sampling rate in Hz. If given, the pre-saccadic slope is estimated
+        lo: array or None, first valid index for each event's windows. None for 0
+        hi: array or None, index after the last valid index for each event's windows. None for len(trace)
+
+    Returns:
+        tuple of arrays (dTot, dPup). dPup is all zeros if sfreq is None
+    """
+    ssStarts = np.asarray(starts, dtype=int) - _SnipStitch.EXTEND_EVENTS
+    ssEnds = np.asarray(ends, dtype=int) + _SnipStitch.EXTEND_EVENTS
+    lo = np.zeros(len(ssStarts), dtype=int) if lo is None else np.asarray(lo, dtype=int)
+    hi = np.full(len(ssStarts), len(trace), dtype=int) if hi is None else np.asarray(hi, dtype=int)
+
+    #window indices with shape (n_events, window width), clamped to the bounds of each event's trial
+    def _Window(first, width):
+        idx = first[:, None] + np.arange(width)[None, :]
+        return trace[np.clip(idx, lo[:, None], hi[:, None] - 1)]
+
+    medianWidth = _SnipStitch.MEDIAN_WIDTH
+    dTot = np.median(_Window(ssEnds, medianWidth), axis=1) - np.median(_Window(ssStarts - medianWidth, medianWidth), axis=1)
+
+    dPup = np.zeros(len(ssStarts))
+    if sfreq is not None:
+        interpolationSamples = max(int(sfreq * _SnipStitch.INTERPOLATION_WIDTH / 1000), 1)
+        window = _Window(ssStarts - interpolationSamples, interpolationSamples)
+
+        #least-squares slope in pupsize/sample, as stats.linregress
+        x = np.arange(interpolationSamples) - (interpolationSamples - 1) / 2
+        slope = ((window - window.mean(axis=1, keepdims=True)) @ x) / np.sum(x ** 2)
+        dPup = slope * (ssEnds - ssStarts)
+
+    return dTot, dPup
+
+def _EstimateSnipStitchesDecimated(trace, starts, ends, samplingRate, factor, interpolate, lo = None, hi = None):
+    """Estimate the parameters of SnipStitch objects on a decimated copy of the trace, with time-based window widths.
+
+    The trace is decimated by averaging non-overlapping bins of factor samples, which acts as the anti-aliasing filter.
+    Unlike a longer FIR or IIR filter, a bin average does not spread the saccadic artifact into neighbouring bins, so the
+    median and slope windows only use bins that lie entirely before or after the (extended) saccade. Median windows span
+    MEDIAN_DURATION ms, and the slope window INTERPOLATION_WIDTH ms. Bins are aligned to the start of each event's trial (lo).
+
+    Args:
+        trace: 1-d numpy array of raw pupil sizes
+        starts: array of event start indices (not extended), at full resolution
+        ends: array of event end indices (not extended), at full resolution
+        samplingRate: float, sampling rate of trace in Hz
+        factor: int, decimation factor
+        interpolate: bool, whether the pre-saccadic slope is estimated
+        lo: array or None, first valid index for each event's windows. None for 0
+        hi: array or None, index after the last valid index for each event's windows. None for len(trace)
+
+    Returns:
+        tuple of arrays (dTot, dPup) in full-resolution units. dPup is all zeros if interpolate is False
+    """
+    ssStarts = np.asarray(starts, dtype=int) - _SnipStitch.EXTEND_EVENTS
+    ssEnds = np.asarray(ends, dtype=int) + _SnipStitch.EXTEND_EVENTS
+    lo = np.zeros(len(ssStarts), dtype=int) if lo is None else np.asarray(lo, dtype=int)
+    hi = np.full(len(ssStarts), len(trace), dtype=int) if hi is None else np.asarray(hi, dtype=int)
+
+    medianWidth, interpolationBins = _DecimatedWidths(samplingRate, factor)
+
+    #bin averages from a cumulative sum, so that bins can be aligned to the start of each event's trial without a loop over trials.
+    #NaNs are summed as 0 and counted separately, so that only bins that contain a NaN are NaN
+    isNan = np.isnan(trace)
+    cumsum = np.concatenate([[0.0], np.cumsum(np.where(isNan, 0.0, trace))])
+    nanCum = np.concatenate([[0], np.cumsum(isNan)])
+    nBins = (hi - lo) // factor
+
+    def _Window(firstBin, width):
+        k = np.clip(firstBin[:, None] + np.arange(width)[None, :], 0, np.maximum(nBins - 1, 0)[:, None])
+        binStarts = lo[:, None] + k * factor
+        means = (cumsum[binStarts + factor] - cumsum[binStarts]) / factor
+        return np.where(nanCum[binStarts + factor] > nanCum[binStarts], np.nan, means)
+
+    #last bin entirely before saccade start (exclusive), and first bin entirely after saccade end
+    preEnd = (ssStarts - lo) // factor
+    postStart = -(-(ssEnds - lo) // factor)
+
+    dTot = np.median(_Window(postStart, medianWidth), axis=1) - np.median(_Window(preEnd - medianWidth, medianWidth), axis=1)
+
+    dPup = np.zeros(len(ssStarts))
+    if interpolate:
+        window = _Window(preEnd - interpolationBins, interpolationBins)
+        x = np.arange(interpolationBins) - (interpolationBins - 1) / 2
+        slope = ((window - window.mean(axis=1, keepdims=True)) @ x) / np.sum(x ** 2) / factor #pupsize/full-resolution sample
+        dPup = slope * (ssEnds - ssStarts)
+
+    #trials that are too short to decimate are estimated at full resolution
+    short = nBins < 2
+    if short.any():
+        dTot[short], dPup[short] = _EstimateSnipStitches(trace, np.asarray(starts)[short], np.asarray(ends)[short],
+                                                         samplingRate if interpolate else None, lo[short], hi[short])
+
+    return dTot, dPup
+
+def _DecimatedWidths(samplingRate, factor):
+    """Return the number of bins in the median windows (MEDIAN_DURATION ms) and in the slope window (INTERPOLATION_WIDTH ms)
+    when estimating on data decimated by factor."""
+    decimatedRate = samplingRate / factor
+    medianWidth = max(int(round(_SnipStitch.MEDIAN_DURATION * decimatedRate / 1000)), 1)
+    interpolationBins = max(int(decimatedRate * _SnipStitch.INTERPOLATION_WIDTH / 1000), 2)
+    return medianWidth, interpolationBins
+
+def _ApplySnipStitches(trace, starts, ends, corrValues, interpolate):
+    """Return a corrected copy of a trace, given the correction value of each event.
+
+    Equals Trial.CorrectedPupsize for events with ascending starts and ends.
+
+    Args:
+        trace: 1-d numpy array of raw pupil sizes
+        starts: array of event start indices (not extended), ascending
+        ends: array of event end indices (not extended), ascending
+        corrValues: array, value subtracted after each event
+        interpolate: bool, whether intra-saccadic values are interpolated (SnipStitchSRate) or held at the corrected start value (SnipStitch)
+
+    Returns:
+        numpy array, corrected trace
+    """
+    n = len(trace)
+    ssStarts = np.asarray(starts, dtype=int) - _SnipStitch.EXTEND_EVENTS
+    ssEnds = np.asarray(ends, dtype=int) + _SnipStitch.EXTEND_EVENTS
+    corrValues = np.asarray(corrValues, dtype=float)
+
+    #cumulative step function: each correction applies from the end of its event onward
+    delta = np.zeros(n + 1)
+    np.add.at(delta, np.clip(ssEnds, 0, n), corrValues)
+    corrected = trace - np.cumsum(delta)[:n]
+
+    #corrected pupil size change over each event, from clamped raw values
+    clamp = lambda idx: np.clip(idx, 0, n - 1)
+    dValues = trace[clamp(ssEnds)] - trace[clamp(ssStarts)] - corrValues
+
+    _StitchEvents(corrected, ssStarts, ssEnds, dValues, interpolate)
+    return corrected
+
+def _StitchEvents(corrected, ssStarts, ssEnds, dValues, interpolate):
+    """Replace values during each event in place, by interpolating from (or holding) the value at event start.
+
+    Events are replaced in order, so that later events see the final values of earlier ones.
+
+    Args:
+        corrected: 1-d numpy array, edited in place
+        ssStarts: array of extended event start indices
+        ssEnds: array of extended event end indices
+        dValues: array, corrected pupil size change over each event
+        interpolate: bool, whether to interpolate (SnipStitchSRate) or hold the value at event start (SnipStitch)
+    """
+    n = len(corrected)
+    for start, end, dValue in zip(ssStarts, ssEnds, dValues):
+        first, last = max(start + 1, 0), min(end, n)
+        if first >= last:
+            continue
+        before = corrected[min(max(start, 0), n - 1)]
+        if interpolate:
+            corrected[first:last] = before + dValue * (np.arange(first, last) - start) / (end - start)
+        else:
+            corrected[first:last] = before
+
+def _EstimateSharedSnipStitches(data, epochFirsts, epochIdxs, starts, ends, sfreq = None, decimation = None, samplingRate = None):
+    """Estimate SnipStitch parameters once per unique saccade of (overlapping) epochs.
+
+    Epochs are placed on the continuous sample axis of the recording they were cut from. Overlapping
+    or adjacent epochs are merged into blocks, and each unique saccade is estimated once on its block,
+    with windows clamped to the bounds of the block.
+
+    Args:
+        data: numpy array with shape (n_epochs, n_times)
+        epochFirsts: array, continuous sample index of the first sample of each epoch
+        epochIdxs: array, epoch index of each event
+        starts: array of event start indices, relative to their epoch
+        ends: array of event end indices, relative to their epoch
+        sfreq: float or None, sampling rate in Hz. If given, the pre-saccadic slope is estimated
+        decimation: int or None. If given, estimate with time-based windows on data decimated by this factor, which may be 1
+                    (see _EstimateSnipStitchesDecimated). None for windows of MEDIAN_WIDTH samples at full resolution
+        samplingRate: float, sampling rate in Hz. Only required if decimation is given
+
+    Returns:
+        tuple of arrays (dTot, dPup), one value per event
+    """
+    epochIdxs = np.asarray(epochIdxs, dtype=int)
+    if len(epochIdxs) == 0:
+        return np.zeros(0), np.zeros(0)
+
+    union, blockOffsets, blockOfEpoch, epochOffsets = _UnionLayout(data, epochFirsts)
+
+    #unique saccades on the union axis
+    absStarts = epochOffsets[epochIdxs] + starts
+    absEnds = epochOffsets[epochIdxs] + ends
+    pairs, first, inverse = np.unique(np.stack([absStarts, absEnds], axis=1), axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    saccBlocks = blockOfEpoch[epochIdxs[first]]
+
+    if decimation is not None:
+        dTot, dPup = _EstimateSnipStitchesDecimated(union, pairs[:, 0], pairs[:, 1], samplingRate, decimation, sfreq is not None,
+                                                    lo=blockOffsets[saccBlocks], hi=blockOffsets[saccBlocks + 1])
+    else:
+        dTot, dPup = _EstimateSnipStitches(union, pairs[:, 0], pairs[:, 1], sfreq,
+                                           lo=blockOffsets[saccBlocks], hi=blockOffsets[saccBlocks + 1])
+    return dTot[inverse], dPup[inverse]
+
+def _UnionLayout(data, epochFirsts):
+    """Lay out (overlapping) epochs on the continuous sample axis of the recording they were cut from.
+
+    Overlapping or adjacent epochs are merged into blocks of contiguous samples, and all blocks are placed in one array.
+    Where epochs overlap, the values of later epochs are kept.
+
+    Args:
+        data: numpy array with shape (n_epochs, n_times)
+        epochFirsts: array, continuous sample index of the first sample of each epoch
+
+    Returns:
+        tuple (union, blockOffsets, blockOfEpoch, epochOffsets): the 1-d array of all blocks, the index of the first sample
+        of each block in union (plus the length of union), the block of each epoch, and the index of the first sample of each epoch in union
+    """
+    nEpochs, nTimes = data.shape
+    epochFirsts = np.asarray(epochFirsts, dtype=int)
+
+    #merge epoch spans into blocks of contiguous samples
+    order = np.argsort(epochFirsts, kind='stable')
+    newBlock = np.ones(nEpochs, dtype=bool)
+    newBlock[1:] = epochFirsts[order][1:] > np.maximum.accumulate(epochFirsts[order] + nTimes)[:-1]
+    blockOfEpoch = np.empty(nEpochs, dtype=int)
+    blockOfEpoch[order] = np.cumsum(newBlock) - 1
+    blockFirsts = epochFirsts[order][newBlock]
+    blockLasts = np.zeros(len(blockFirsts), dtype=int)
+    np.maximum.at(blockLasts, blockOfEpoch, epochFirsts + nTimes)
+
+    #lay out all blocks in one array
+    blockOffsets = np.concatenate([[0], np.cumsum(blockLasts - blockFirsts)])
+    union = np.empty(blockOffsets[-1])
+    epochOffsets = blockOffsets[blockOfEpoch] + epochFirsts - blockFirsts[blockOfEpoch]
+    for i in range(nEpochs):
+        union[epochOffsets[i]:epochOffsets[i] + nTimes] = data[i]
+
+    return union, blockOffsets, blockOfEpoch, epochOffsets
+
+def _LazyBlock(block, mask, sfreq, interpolate, depth, block_info = None):
+    """Correct one (overlapping) block of a chunked array. Used by Functions.SnipAndStitch_Lazy.
+
+    Each row along the last axis is handled as one trial. Saccades are read from the mask as runs of True values.
+    The halo of depth samples is removed from the result, on each side of the block that borders another chunk.
+
+    Args:
+        block: numpy array of raw pupil sizes, time on the last axis, including halo samples
+        mask: boolean numpy array of the same shape, True during saccades
+        sfreq: float or None, sampling rate in Hz. If given, the pre-saccadic slope is estimated
+        interpolate: bool, whether intra-saccadic values are interpolated
+        depth: int, number of halo samples on each side that borders another chunk along time
+        block_info: dict passed by dask, used to find the position of the block along time
+
+    Returns:
+        numpy array with the shape of block without halo, plus a last axis of length 2: raw values with corrected values
+        during saccades, and the correction value of each saccade placed at its (extended) end index
+    """
+    location = block_info[0]['chunk-location'][-1]
+    nChunks = block_info[0]['num-chunks'][-1]
+    left = depth if location > 0 else 0
+    right = depth if location < nChunks - 1 else 0
+
+    rows = block.reshape(-1, block.shape[-1])
+    masks = mask.reshape(-1, mask.shape[-1])
+    stitched = rows.astype(float)
+    steps = np.zeros(rows.shape)
+    n = rows.shape[1]
+
+    preWidth = _SnipStitch.MEDIAN_WIDTH
+    if sfreq is not None:
+        preWidth = max(preWidth, int(sfreq * _SnipStitch.INTERPOLATION_WIDTH / 1000))
+
+    for row, rowMask, rowStitched, rowSteps in zip(rows, masks, stitched, steps):
+        #saccade runs: start inclusive, end exclusive
+        edges = np.diff(np.concatenate([[0], rowMask.astype(np.int8), [0]]))
+        starts = np.nonzero(edges == 1)[0]
+        ends = np.nonzero(edges == -1)[0]
+        if len(starts) == 0:
+            continue
+
+        ssStarts = starts - _SnipStitch.EXTEND_EVENTS
+        ssEnds = ends + _SnipStitch.EXTEND_EVENTS
+
+        #a saccade that changes the kept samples must be estimated without reaching into the outer edge of the halo,
+        #where it would be cut off or its windows clamped, unlike in the full trial
+        changesCore = (ssEnds >= left) & (ssStarts + 1 < n - right)
+        cutOff = ((left > 0) & (ssStarts - preWidth < 0)) | ((right > 0) & (ssEnds + _SnipStitch.MEDIAN_WIDTH > n))
+        if (changesCore & cutOff).any():
+            raise ValueError(f"A saccade of at least {(ends - starts)[changesCore & cutOff].max()} samples does not fit in the samples shared between chunks. "
+                             "Increase maxSaccadeDuration, or use larger chunks along time")
+
+        dTot, dPup = _EstimateSnipStitches(row, starts, ends, sfreq)
+        corrValues = dTot - dPup
+
+        inRow = ssEnds < n
+        np.add.at(rowSteps, ssEnds[inRow], corrValues[inRow])
+
+        clamp = lambda idx: np.clip(idx, 0, n - 1)
+        dValues = row[clamp(ssEnds)] - row[clamp(ssStarts)] - corrValues
+        _StitchEvents(rowStitched, ssStarts, ssEnds, dValues, interpolate)
+
+    out = np.stack([stitched, steps], axis=-1).reshape(block.shape + (2,))
+    return out[..., left:n - right, :]
@@ -0,0 +1,80 @@
+"""This file is part of the 'snipandstitch' package.
+
+This module contains the private vectorized saccade detector. See Functions.DetectSaccades for usage.
+"""
+import numpy as np
+
+
+def _DetectSaccades(x, y, sfreq, velocityThreshold = None, accelerationThreshold = None, velocityFactor = 6.0, minDuration = 0.012, minInterval = 0.02):
+    """Detect saccades from gaze positions using velocity and (optionally) acceleration thresholds.
+
+    Args:
+        x: 1-d array of horizontal gaze positions
+        y: 1-d array of vertical gaze positions
+        sfreq: sampling rate in Hz
+        velocityThreshold: float or None, speed threshold in position units/s. None for an adaptive threshold
+                           of velocityFactor median-based standard deviations per axis (Engbert & Kliegl, 2003, see _NoiseSD)
+        accelerationThreshold: float or None, samples where the absolute acceleration (units/s^2) exceeds this value are also saccadic
+        velocityFactor: float, multiplier of the adaptive threshold
+        minDuration: float, minimum saccade duration in seconds
+        minInterval: float, saccades separated by a shorter interval (s) are merged
+
+    Returns:
+        tuple of int arrays (starts, ends), sample indices of saccade on- and offset. Ends are exclusive
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) < 2:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    #velocity from central differences, in units/s
+    vx = np.gradient(x) * sfreq
+    vy = np.gradient(y) * sfreq
+    speed = np.hypot(vx, vy)
+
+    #samples with missing data (NaN) are never saccadic, as comparisons with NaN are False
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        if velocityThreshold is None:
+            #elliptic threshold from an estimate of the velocity noise on each axis
+            #a constant axis (radius 0, e.g. dummy positions) does not contribute
+            ellipse = np.zeros(len(x))
+            for v in (vx, vy):
+                radius = velocityFactor * _NoiseSD(v)
+                if radius > 0:
+                    ellipse += (v / radius) ** 2
+            saccadic = ellipse > 1
+        else:
+            saccadic = speed > velocityThreshold
+
+        if accelerationThreshold is not None:
+            acceleration = np.abs(np.gradient(speed)) * sfreq
+            saccadic |= acceleration > accelerationThreshold
+
+    #runs of saccadic samples: start inclusive, end exclusive
+    edges = np.diff(np.concatenate([[0], saccadic.astype(np.int8), [0]]))
+    starts = np.nonzero(edges == 1)[0]
+    ends = np.nonzero(edges == -1)[0]
+
+    #merge runs separated by short gaps
+    if len(starts) > 1:
+        keep = np.ones(len(starts), dtype=bool)
+        keep[1:] = (starts[1:] - ends[:-1]) >= int(minInterval * sfreq)
+        starts = starts[keep]
+        ends = ends[np.concatenate([keep[1:], [True]])]
+
+    #drop short runs
+    long = (ends - starts) >= max(int(minDuration * sfreq), 1)
+    return starts[long], ends[long]
+
+def _NoiseSD(v):
+    """Return the median-based standard deviation of one velocity axis (Engbert & Kliegl, 2003).
+
+    If the median-based estimate vanishes, e.g. when more than half of the velocities are zero due to quantized
+    positions, the mean-based estimate is used instead, as in the reference implementation. Returns 0 only if the axis is constant.
+    """
+    sd = np.sqrt(np.nanmedian(v ** 2) - np.nanmedian(v) ** 2)
+    if not sd >= np.finfo(float).tiny:
+        sd = np.sqrt(np.nanmean(v ** 2) - np.nanmean(v) ** 2)
+    if not sd >= np.finfo(float).tiny:
+        return 0.0
+    return sd
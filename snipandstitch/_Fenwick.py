@@ -0,0 +1,52 @@
+"""This file is part of the 'snipandstitch' package.
+
+This module contains a private Fenwick tree (binary indexed tree), used by Trial objects
+to keep the cumulative corrections of their saccades up to date.
+"""
+
+class _FenwickTree():
+    """Internal prefix-sum tree over a list of floats with O(log n) updates and queries."""
+    def __init__(self, values):
+        """Build the tree in O(n).
+
+        Args:
+            values: list of floats
+        """
+        self._values = list(values)
+        self._tree = [0.0] + self._values
+        n = len(self._values)
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                self._tree[parent] += self._tree[i]
+
+    def __len__(self):
+        """Return the number of values in the tree."""
+        return len(self._values)
+
+    def Set(self, position, value):
+        """Set the value at a position.
+
+        Args:
+            position: int, 0-based position of the value
+            value: float, new value
+        """
+        delta = value - self._values[position]
+        self._values[position] = value
+        i = position + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def PrefixSum(self, count):
+        """Return the sum of the first count values.
+
+        Args:
+            count: int, number of values to sum
+        """
+        total = 0.0
+        i = count
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
@@ -6,6 +6,7 @@ from scipy import stats
 INTERPOLATION_WIDTH = 100.0 #ms
 EXTEND_EVENTS = 1 #sample
 MEDIAN_WIDTH = 4 #samples
+MEDIAN_DURATION = 10.0 #ms, median window width when estimating on decimated data
 
 import matplotlib.pyplot as plt
 
@@ -17,6 +18,9 @@ import matplotlib.pyplot as plt
 #trial: a Trial object
 #event: an Event object
 class SnipStitch():
+    #numeric state, in the order used for pickling (see __getstate__ and Trial.__getstate__)
+    _STATE = ('_startIndex', '_endIndex', '_dTot', '_dCorr', '_dValue', 'doInterpolateSlope')
+
     def __init__(self, trial, event):
         """Initialize SnipStitch object.
         
@@ -51,13 +55,9 @@ class SnipStitch():
 
     def SetInterpolation(self):
         """Set pupil values between saccade on- and offset using linear interpolation."""
-        #get dVal
-        correctedValueBefore = self._trial.CorrectedPupsize(index=self._startIndex)
-        dValue = self._trial.RawPupsize(self._endIndex) - self._trial.RawPupsize(self._startIndex) - self.corrValue
-
-        #set lambda that takes time in trial
-        #          relative time in saccade -> pupPre              + (corrected pupil size change over saccade) * (relative time in saccade)
-        self._interpolationLambda = lambda x: correctedValueBefore + (dValue * (x - self._startIndex) / (self._endIndex - self._startIndex))
+        #get dVal, the corrected pupil size change over the saccade
+        #the corrected value at saccade start is looked up when correcting, so that it follows edits to earlier saccades in the trial
+        self._dValue = self._trial.RawPupsize(self._endIndex) - self._trial.RawPupsize(self._startIndex) - self.corrValue
 
     def Interpolate_dPup(self, trial):
         """Set doInterpolateSlope to False in this object. (overwritten by SnipStitchSRate objects)"""
@@ -118,9 +118,28 @@ class SnipStitch():
     def __repr__(self):
         """Return text explanation of the snipandstitch. Logs corrValue property and its counterparts."""
         return f"SnipStitch. Adding {self.corrValue} ({self._dTot}+{self._dCorr}). "
+
+    def __getstate__(self):
+        """Return the numeric state of this SnipStitch for pickling.
+
+        The references to the trial and event are not included. When a Trial is unpickled, it re-attaches itself and its events.
+        """
+        return {key: getattr(self, key) for key in self._STATE}
+
+    def __setstate__(self, state):
+        """Restore the numeric state of this SnipStitch. The trial and event are set to None until re-attached by a Trial."""
+        for key, value in state.items():
+            setattr(self, key, value)
+        self._startIndex = int(self._startIndex)
+        self._endIndex = int(self._endIndex)
+        self.doInterpolateSlope = bool(self.doInterpolateSlope)
+        self._trial = None
+        self._event = None
     
 
 class SnipStitchSRate(SnipStitch):
+    _STATE = SnipStitch._STATE + ('_dPup',)
+
     def __init__(self, trial, event):
         """
         __init__
@@ -180,8 +199,9 @@ class SnipStitchSRate(SnipStitch):
             return value - self.corrValue
         
         #if index during saccade, return interpolated value between start and end
+        #          pupPre                                          + (corrected pupil size change over saccade) * (relative time in saccade)
         else:
-            return self._interpolationLambda(index)
+            return self._trial.CorrectedPupsize(index=self._startIndex) + (self._dValue * (index - self._startIndex) / (self._endIndex - self._startIndex))
 
 
     def __repr__(self):
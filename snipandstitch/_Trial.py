@@ -4,9 +4,11 @@ This module contains private and internal definitions for the Trial class.
 See Trial.py for public methods.
 """
 
-from . import _SnipStitch
+from . import _SnipStitch, _Fenwick
+import numpy as np
 import matplotlib.pyplot as plt
 from math import dist
+from bisect import bisect_left, bisect_right
 
 class _T():
     """Internal Trial class containing information of one trial.
@@ -22,13 +24,15 @@ class _T():
             samplingRate: Sampling rate in Hz
         """
         self._trace = trace
-        self._events = events
+        self._events = list(events) #copy, so that adding or removing events does not edit the caller's list
         self._samplingRate = samplingRate
+        self._snipStitchSettings = {'doInterpolateSlope': None, 'participantCorrectionValue': None}
 
-        #check if events are in the trace
-        end = self._events[-1].end
-        if end > len(self._trace):
-            raise ValueError(f"Events should be provided relative to each trial, but the last event ends at index {end} while the trace has length {len(self._trace)}")
+        #check if all events are in the trace
+        ends = np.array([event.end for event in self._events], dtype=int)
+        outside = ends > len(self._trace)
+        if outside.any():
+            raise ValueError(f"Events should be provided relative to each trial, but {outside.sum()} events end after the trace (latest at index {ends.max()}) while the trace has length {len(self._trace)}")
 
         #call _MakeSnipStitches
         self._MakeSnipStitches()
@@ -45,7 +49,17 @@ class _T():
         """
         if not hasattr(self, '_SnipStitches'):
             raise ValueError("SnipStitches not set")
-        
+
+        #if saccades are ordered, look up the cumulative correction in the index structure
+        if self._ssOrdered:
+            #the last saccade starting before index is the only one that can contain index
+            k = bisect_left(self._ssStarts, index) - 1
+            if k >= 0 and index < self._ssEnds[k]:
+                return self._SnipStitches[k].Correct(index, value)
+
+            #otherwise, subtract the corrections of all saccades that ended at or before index
+            return value - self._ssCorrections.PrefixSum(bisect_right(self._ssEnds, index))
+
         for ss in self._SnipStitches:
             value = ss.Correct(index, value)
         return value
@@ -83,6 +97,14 @@ class _T():
             raise ValueError("SnipStitches not set when accessing residual error of a trial")
         return sum([ss.corrValue for ss in self._SnipStitches])
 
+    @property
+    def events(self):
+        """Return a list of the Event objects of this trial, ordered by start index.
+
+        These objects can be passed to RemoveEvent and ModifyEvent, also after the trial was pickled or copied.
+        """
+        return sorted(self._events, key=lambda e: e.start)
+
     @property
     def eventCount(self):
         """Return the number of events in this trial."""
@@ -96,16 +118,137 @@ class _T():
         """Return string representation of Trial object."""
         return f"Trial"
 
+    def __getstate__(self):
+        """Return the state of this Trial as plain numeric arrays and settings, for pickling and copying.
+
+        The trace is stored as given, so that it keeps its type (e.g. a list of samples), events as an array of start and
+        end indices, and all SnipStitch objects as one array of parameters, so that they are restored without re-estimation.
+        """
+        ssClass = self._SnipStitchClass()
+        return {'trace': self._trace,
+                'samplingRate': self._samplingRate,
+                'settings': dict(self._snipStitchSettings),
+                'events': np.array([[event.start, event.end] for event in self._events], dtype=int).reshape(-1, 2),
+                'snipStitches': np.array([[getattr(ss, key) for key in ssClass._STATE] for ss in self._SnipStitches], dtype=float).reshape(-1, len(ssClass._STATE))}
+
+    def __setstate__(self, state):
+        """Restore a Trial from the state returned by __getstate__."""
+        from .Event import Event
+
+        self._trace = state['trace']
+        self._samplingRate = state['samplingRate']
+        self._snipStitchSettings = state['settings']
+        self._events = [Event(int(start), int(end)) for start, end in state['events']]
+
+        ssClass = self._SnipStitchClass()
+        self._SnipStitches = []
+        for event, parameters in zip(self._events, state['snipStitches']):
+            ss = ssClass.__new__(ssClass)
+            ss.__setstate__(dict(zip(ssClass._STATE, parameters)))
+            ss._trial = self
+            ss._event = event
+            self._SnipStitches.append(ss)
+
+        self._BuildIndex()
+
     def _MakeSnipStitches(self):
         """Initializes SnipStitch objects for this trial."""
-        self._SnipStitches = []
+        self._SnipStitches = [self._MakeSnipStitch(event) for event in self._events]
+        self._BuildIndex()
 
-        if self._samplingRate is None:
-            for event in self._events:
-                self._SnipStitches.append(_SnipStitch.SnipStitch(self, event))
+    def _MakeSnipStitch(self, event):
+        """Return a SnipStitch object for one event, using the current settings of this trial.
+
+        Args:
+            event: Event object
+        """
+        ss = self._SnipStitchClass()(self, event)
+
+        if any(v is not None for v in self._snipStitchSettings.values()):
+            ss.SetCorrectionSettings(**self._snipStitchSettings)
+        return ss
+
+    def _SnipStitchClass(self):
+        """Return the SnipStitch class used by this trial, which depends on whether the sampling rate is known."""
+        return _SnipStitch.SnipStitch if self._samplingRate is None else _SnipStitch.SnipStitchSRate
+
+    def _BuildIndex(self):
+        """Build the index structure used to look up cumulative corrections of the SnipStitches.
+
+        Lookups through the index are only used if saccade starts and ends are both in ascending order.
+        Otherwise, every SnipStitch is applied one after the other.
+        """
+        self._ssStarts = [ss._startIndex for ss in self._SnipStitches]
+        self._ssEnds = [ss._endIndex for ss in self._SnipStitches]
+        self._ssOrdered = (all(a <= b for a, b in zip(self._ssStarts, self._ssStarts[1:])) and
+                           all(a <= b for a, b in zip(self._ssEnds, self._ssEnds[1:])))
+        self._ssCorrections = _Fenwick._FenwickTree([ss.corrValue for ss in self._SnipStitches])
+
+    def _CheckEvent(self, start, end):
+        """Raise ValueError if an event with these start and end indices does not fit in the trace of this trial."""
+        if start < 0:
+            raise ValueError(f"Events should be provided relative to each trial, but an event starts at index {start}")
+        if end <= start:
+            raise ValueError(f"An event should end after it starts, but an event starts at index {start} and ends at index {end}")
+        if end > len(self._trace):
+            raise ValueError(f"Events should be provided relative to each trial, but an event ends at index {end} while the trace has length {len(self._trace)}")
+
+    #_AddEvent
+    #see Trial.py for usage
+    def _AddEvent(self, event):
+        """Add an event to this trial, estimating only the new SnipStitch."""
+        self._CheckEvent(event.start, event.end)
+
+        #keep events sorted on start index
+        position = bisect_right([e.start for e in self._events], event.start)
+        self._events.insert(position, event)
+        self._SnipStitches.insert(position, self._MakeSnipStitch(event))
+
+        #inserting shifts the positions of all later saccades, so the index is rebuilt without re-estimating them
+        self._BuildIndex()
+
+    #_RemoveEvent
+    #see Trial.py for usage
+    def _RemoveEvent(self, event):
+        """Remove an event from this trial."""
+        position = self._events.index(event)
+        del self._events[position]
+        del self._SnipStitches[position]
+        self._BuildIndex()
+
+    #_ModifyEvent
+    #see Trial.py for usage
+    def _ModifyEvent(self, event, start = None, end = None):
+        """Change start and/or end of an event in this trial, re-estimating only its SnipStitch."""
+        position = self._events.index(event)
+        start = event.start if start is None else start
+        end = event.end if end is None else end
+
+        #check before editing, so that the event and its SnipStitch are unchanged if the new bounds are invalid
+        self._CheckEvent(start, end)
+        event.start, event.end = start, end
+
+        ss = self._MakeSnipStitch(event)
+        self._SnipStitches[position] = ss
+
+        #if the saccade keeps its place in the order, only its own correction is updated in O(log S)
+        previous = position - 1
+        following = position + 1
+        keepsOrder = (self._ssOrdered and
+                      (previous < 0 or (self._ssStarts[previous] <= ss._startIndex and self._ssEnds[previous] <= ss._endIndex)) and
+                      (following >= len(self._SnipStitches) or (ss._startIndex <= self._ssStarts[following] and ss._endIndex <= self._ssEnds[following])))
+
+        if keepsOrder:
+            self._ssStarts[position] = ss._startIndex
+            self._ssEnds[position] = ss._endIndex
+            self._ssCorrections.Set(position, ss.corrValue)
         else:
-            for event in self._events:
-                self._SnipStitches.append(_SnipStitch.SnipStitchSRate(self, event))
+            del self._events[position]
+            del self._SnipStitches[position]
+            position = bisect_right([e.start for e in self._events], event.start)
+            self._events.insert(position, event)
+            self._SnipStitches.insert(position, ss)
+            self._BuildIndex()
 
     #_SetSnipStitchSettings
     #see Functions.py for usage
@@ -118,6 +261,15 @@ class _T():
         for ss in self._SnipStitches:
             ss.SetCorrectionSettings(doInterpolateSlope, participantCorrectionValue)
 
+        #remember settings for SnipStitches that are added later
+        if doInterpolateSlope is not None:
+            self._snipStitchSettings['doInterpolateSlope'] = doInterpolateSlope
+        if participantCorrectionValue is not None:
+            self._snipStitchSettings['participantCorrectionValue'] = participantCorrectionValue
+
+        #settings change the correction of every saccade, but no saccade is re-estimated
+        self._BuildIndex()
+
     #_ClampIndex
     #clamps an index, ensuring that no out-of-bounds indeces are used
     #args:
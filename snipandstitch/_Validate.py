@@ -0,0 +1,204 @@
+"""This file is part of the 'snipandstitch' package.
+
+This module contains the private validation pass that checks all events at once, before any correction is estimated.
+See Functions.ValidateEvents for usage.
+"""
+import numpy as np
+from . import _SnipStitch, _Correction
+
+
+def _ValidateEvents(data, starts, ends, epochIdx = None, samplingRate = None):
+    """Check all events of one or more trials as arrays.
+
+    Args:
+        data: 1-d array of pupil sizes (one trial), or 2-d array with shape (n_epochs, n_times)
+        starts: array of event start indices, relative to their trial
+        ends: array of event end indices, relative to their trial
+        epochIdx: array with the trial index of each event. None if data is 1-d
+        samplingRate: sampling rate in Hz, or None. If given, the pre-saccadic slope windows are checked as well
+
+    Returns:
+        dict of per-event boolean masks ('unsorted', 'reversed', 'overlapping', 'outOfWindow', 'nanInWindow', 'invalid'),
+        a per-trial boolean mask 'emptyEpochs', and a 'summary' dict with counts
+    """
+    data = np.atleast_2d(np.asarray(data, dtype=float))
+    nEpochs, nTimes = data.shape
+    starts, ends, epochIdx = _EventArrays(starts, ends, epochIdx)
+
+    #events as extended by SnipStitch objects
+    ssStarts = starts - _SnipStitch.EXTEND_EVENTS
+    ssEnds = ends + _SnipStitch.EXTEND_EVENTS
+
+    overlapping = _Overlapping(ssStarts, ssEnds, epochIdx)
+
+    #windows used by SnipStitch objects: median windows before and after the extended event, and optionally the slope window
+    preWidth = _SnipStitch.MEDIAN_WIDTH
+    if samplingRate is not None:
+        preWidth = max(preWidth, int(samplingRate * _SnipStitch.INTERPOLATION_WIDTH / 1000), 1)
+
+    #check the windows of all trials on one flat array
+    validEpoch = (epochIdx >= 0) & (epochIdx < nEpochs)
+    offsets = np.clip(epochIdx, 0, nEpochs - 1) * nTimes
+    outOfWindow, nanInWindow = _CheckWindows(data.ravel(), offsets, offsets + nTimes, offsets + ssStarts, offsets + ssEnds,
+                                             offsets + ssStarts - preWidth, offsets + ssEnds + _SnipStitch.MEDIAN_WIDTH)
+
+    return _Result(starts, ends, epochIdx, nEpochs, validEpoch, overlapping, outOfWindow, validEpoch & nanInWindow)
+
+def _ValidateSharedEvents(data, epochFirsts, starts, ends, epochIdx, samplingRate = None, decimation = None, fullRate = None):
+    """Check all events of (overlapping) epochs as estimated by shared estimation (see _Correction._EstimateSharedSnipStitches).
+
+    Windows are checked on the union of all epoch spans, so that they only need to fit in the block of contiguous
+    epochs that contains the event, not in each epoch. Each unique saccade is checked once.
+
+    Args:
+        data: 2-d array with shape (n_epochs, n_times)
+        epochFirsts: array, continuous sample index of the first sample of each epoch
+        starts: array of event start indices, relative to their epoch
+        ends: array of event end indices, relative to their epoch
+        epochIdx: array with the epoch index of each event
+        samplingRate: sampling rate in Hz, or None. If given, the pre-saccadic slope windows are checked as well
+        decimation: int or None, decimation factor of the estimation (see _Correction._EstimateSnipStitchesDecimated). None for full-rate windows
+        fullRate: float, sampling rate of data in Hz. Only required if decimation is given
+
+    Returns:
+        dict as returned by _ValidateEvents
+    """
+    data = np.atleast_2d(np.asarray(data, dtype=float))
+    nEpochs = data.shape[0]
+    starts, ends, epochIdx = _EventArrays(starts, ends, epochIdx)
+    validEpoch = (epochIdx >= 0) & (epochIdx < nEpochs)
+
+    overlapping = np.zeros(len(starts), dtype=bool)
+    outOfWindow = np.zeros(len(starts), dtype=bool)
+    nanInWindow = np.zeros(len(starts), dtype=bool)
+    if validEpoch.any():
+        union, blockOffsets, blockOfEpoch, epochOffsets = _Correction._UnionLayout(data, epochFirsts)
+
+        #unique saccades on the union axis
+        ep = epochIdx[validEpoch]
+        absPairs = np.stack([epochOffsets[ep] + starts[validEpoch], epochOffsets[ep] + ends[validEpoch]], axis=1)
+        pairs, first, inverse = np.unique(absPairs, axis=0, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        blocks = blockOfEpoch[ep[first]]
+        lo, hi = blockOffsets[blocks], blockOffsets[blocks + 1]
+
+        ssStarts = pairs[:, 0] - _SnipStitch.EXTEND_EVENTS
+        ssEnds = pairs[:, 1] + _SnipStitch.EXTEND_EVENTS
+
+        if decimation is None:
+            preWidth = _SnipStitch.MEDIAN_WIDTH
+            if samplingRate is not None:
+                preWidth = max(preWidth, int(samplingRate * _SnipStitch.INTERPOLATION_WIDTH / 1000), 1)
+            windowFirsts = ssStarts - preWidth
+            windowLasts = ssEnds + _SnipStitch.MEDIAN_WIDTH
+        else:
+            #bins entirely before and after the extended event, aligned to the start of the block; a partial last bin is not used
+            medianWidth, interpolationBins = _Correction._DecimatedWidths(fullRate, decimation)
+            preBins = medianWidth if samplingRate is None else max(medianWidth, interpolationBins)
+            windowFirsts = lo + ((ssStarts - lo) // decimation - preBins) * decimation
+            windowLasts = lo + (-(-(ssEnds - lo) // decimation) + medianWidth) * decimation
+            hi = lo + (hi - lo) // decimation * decimation
+
+        outOfUnique, nanInUnique = _CheckWindows(union, lo, hi, ssStarts, ssEnds, windowFirsts, windowLasts)
+        overlapping[validEpoch] = _Overlapping(ssStarts, ssEnds, blocks)[inverse]
+        outOfWindow[validEpoch] = outOfUnique[inverse]
+        nanInWindow[validEpoch] = nanInUnique[inverse]
+
+    return _Result(starts, ends, epochIdx, nEpochs, validEpoch, overlapping, outOfWindow, nanInWindow)
+
+def _EventArrays(starts, ends, epochIdx):
+    """Return starts, ends and trial indices of events as flat int arrays."""
+    starts = np.asarray(starts, dtype=int).ravel()
+    ends = np.asarray(ends, dtype=int).ravel()
+    if epochIdx is None:
+        epochIdx = np.zeros(len(starts), dtype=int)
+    return starts, ends, np.asarray(epochIdx, dtype=int).ravel()
+
+def _CheckWindows(flat, trialFirsts, trialLasts, ssStarts, ssEnds, windowFirsts, windowLasts):
+    """Check the estimation windows of events on a flat array that holds all trials.
+
+    All indices are indices in flat. Samples from windowFirsts up to and including ssStarts, and from ssEnds
+    up to windowLasts (exclusive) are read when estimating an event.
+
+    Returns:
+        tuple of boolean arrays (outOfWindow, nanInWindow)
+    """
+    outOfWindow = (windowFirsts < trialFirsts) | (windowLasts > trialLasts)
+
+    #count NaNs in windows using a cumulative sum, so that each window is checked in O(1)
+    nanCum = np.zeros(len(flat) + 1)
+    nanCum[1:] = np.cumsum(np.isnan(flat))
+    clip = lambda idx: np.clip(idx, trialFirsts, trialLasts)
+    nanBefore = nanCum[clip(ssStarts + 1)] - nanCum[clip(windowFirsts)]
+    nanAfter = nanCum[clip(windowLasts)] - nanCum[clip(ssEnds)]
+    return outOfWindow, (nanBefore > 0) | (nanAfter > 0)
+
+def _Result(starts, ends, epochIdx, nEpochs, validEpoch, overlapping, outOfWindow, nanInWindow):
+    """Combine the checks of all events into the dict returned by _ValidateEvents."""
+    #compare each event to the event before it in the same trial
+    sameEpoch = np.zeros(len(starts), dtype=bool)
+    sameEpoch[1:] = epochIdx[1:] == epochIdx[:-1]
+
+    unsorted = np.zeros(len(starts), dtype=bool)
+    unsorted[1:] = (epochIdx[1:] < epochIdx[:-1]) | (sameEpoch[1:] & (starts[1:] < starts[:-1]))
+
+    reversedEvents = ends <= starts
+
+    invalid = unsorted | reversedEvents | overlapping | outOfWindow | nanInWindow | ~validEpoch
+
+    emptyEpochs = np.bincount(epochIdx[validEpoch], minlength=nEpochs) == 0
+
+    summary = {'events': len(starts),
+               'epochs': nEpochs,
+               'unsorted': int(unsorted.sum()),
+               'reversed': int(reversedEvents.sum()),
+               'overlapping': int(overlapping.sum()),
+               'outOfWindow': int(outOfWindow.sum()),
+               'nanInWindow': int(nanInWindow.sum()),
+               'invalid': int(invalid.sum()),
+               'emptyEpochs': int(emptyEpochs.sum())}
+
+    return {'unsorted': unsorted,
+            'reversed': reversedEvents,
+            'overlapping': overlapping,
+            'outOfWindow': outOfWindow,
+            'nanInWindow': nanInWindow,
+            'invalid': invalid,
+            'emptyEpochs': emptyEpochs,
+            'summary': summary}
+
+def _Overlapping(ssStarts, ssEnds, epochIdx):
+    """Return a boolean mask of events that overlap any other event of the same trial.
+
+    Events are sorted on trial and start. Each start is compared to the running maximum of the ends of all earlier
+    events in its trial, so that an event is also found if it overlaps an earlier, non-adjacent event.
+    Both the later event and the earlier event with the running maximum end are marked.
+
+    Args:
+        ssStarts: array of (extended) event start indices, relative to their trial
+        ssEnds: array of (extended) event end indices, relative to their trial
+        epochIdx: array with the trial index of each event
+    """
+    overlapping = np.zeros(len(ssStarts), dtype=bool)
+    if len(ssStarts) < 2:
+        return overlapping
+
+    order = np.lexsort((ssStarts, epochIdx))
+    epochRank = np.unique(epochIdx[order], return_inverse=True)[1].ravel()
+    sameEpoch = epochRank[1:] == epochRank[:-1]
+
+    #shift each trial by a multiple of the index range, so that one running maximum never carries over to the next trial
+    low = min(ssStarts.min(), ssEnds.min())
+    span = max(ssStarts.max(), ssEnds.max()) - low + 1
+    shiftedStarts = ssStarts[order] - low + epochRank * span
+    shiftedEnds = ssEnds[order] - low + epochRank * span
+
+    #running maximum of earlier ends, and the position of the event it belongs to
+    runningMax = np.maximum.accumulate(shiftedEnds)
+    positions = np.arange(len(order))
+    runningArgmax = np.maximum.accumulate(np.where(shiftedEnds == runningMax, positions, 0))
+
+    overlapWithEarlier = sameEpoch & (shiftedStarts[1:] < runningMax[:-1])
+    overlapping[order[1:][overlapWithEarlier]] = True
+    overlapping[order[runningArgmax[:-1][overlapWithEarlier]]] = True
+    return overlapping
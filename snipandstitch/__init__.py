@@ -1,4 +1,4 @@
 """This file is part of the 'snipandstitch' package."""
 
-from . import Trial, Event, Viewer, Functions
-__all__ = ['Trial', 'Event', 'Viewer', 'Functions']
+from . import Trial, Event, Viewer, Functions, Batch
+__all__ = ['Trial', 'Event', 'Viewer', 'Functions', 'Batch']
@@ -0,0 +1,36 @@
+"""Shared synthetic data for the snipandstitch tests."""
+import numpy as np
+import pytest
+
+
+def _SyntheticTrace(rng, nSamples, nSaccades, minGap = 150, noise = 0.01):
+    """Return a pupil trace with saccadic steps, and the saccade start and end indices (ends exclusive).
+
+    The pupil size is a slow oscillation plus white noise. During each saccade the measured size jumps,
+    and after each saccade it stays offset by a random step, as for a change in gaze position.
+    Saccades are separated by at least minGap samples, and leave at least minGap samples at either end of the trace.
+    """
+    durations = rng.integers(8, 30, nSaccades)
+    gaps = minGap + rng.integers(0, minGap, nSaccades + 1)
+    gaps = np.floor(gaps * (nSamples - durations.sum()) / gaps.sum()).astype(int)
+    starts = gaps[0] + np.concatenate([[0], np.cumsum(gaps[1:-1] + durations[:-1])])
+    ends = starts + durations
+
+    t = np.arange(nSamples)
+    trace = 3.0 + 0.2 * np.sin(t / 400) + noise * rng.standard_normal(nSamples)
+    steps = np.zeros(nSamples + 1)
+    np.add.at(steps, ends, rng.normal(0, 0.3, nSaccades))
+    trace += np.cumsum(steps)[:nSamples]
+    for start, end in zip(starts, ends):
+        trace[start:end] += rng.normal(0, 0.5) * np.sin(np.linspace(0, np.pi, end - start))
+
+    return trace, starts, ends
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(2024)
+
+@pytest.fixture
+def makeTrace(rng):
+    """Factory for synthetic traces, see _SyntheticTrace."""
+    return lambda nSamples, nSaccades, **kwargs: _SyntheticTrace(rng, nSamples, nSaccades, **kwargs)
@@ -0,0 +1,78 @@
+"""Manifest, journal and resume logic of the batch runner. Recordings fail here, as the input files do not exist."""
+import json
+
+import pytest
+
+from snipandstitch import Batch
+
+
+def _WriteManifest(folder, recordings, settings = None):
+    manifestPath = folder / 'manifest.json'
+    manifestPath.write_text(json.dumps({'settings': settings or {'channel': 'pupil_right'}, 'recordings': recordings}))
+    return str(manifestPath)
+
+def _MarkDone(manifestPath, item):
+    """Write the output of a recording and journal it as done, as a completed earlier run would."""
+    open(item['output'], 'w').close()
+    with open(manifestPath + '.journal', 'a') as journal:
+        journal.write(json.dumps({'id': item['id'], 'output': item['output'], 'hash': Batch.RecordingHash(item), 'status': 'done'}) + '\n')
+
+def test_settings_merge(tmp_path):
+    manifestPath = _WriteManifest(tmp_path, [{'id': 'a', 'input': 'a_raw.fif', 'output': 'out/a_raw.fif'},
+                                             {'id': 'b', 'input': 'b-epo.fif', 'output': 'b-epo.fif', 'settings': {'interpolateDPup': False, 'channel': 'pupil_left'}}],
+                                  settings={'channel': 'pupil_right', 'interpolateDPup': True})
+    items = Batch.LoadManifest(manifestPath)
+
+    assert items[0]['settings'] == {'channel': 'pupil_right', 'interpolateDPup': True}
+    assert items[1]['settings'] == {'channel': 'pupil_left', 'interpolateDPup': False}
+    assert [item['type'] for item in items] == ['raw', 'epochs']
+    assert items[0]['output'] == str(tmp_path / 'out' / 'a_raw.fif')
+
+def test_duplicate_ids(tmp_path):
+    manifestPath = _WriteManifest(tmp_path, [{'id': 'a', 'input': 'a.fif', 'output': 'a1.fif'},
+                                             {'id': 'a', 'input': 'b.fif', 'output': 'a2.fif'}])
+    with pytest.raises(ValueError):
+        Batch.LoadManifest(manifestPath)
+
+def test_truncated_journal_line(tmp_path):
+    manifestPath = _WriteManifest(tmp_path, [{'id': 'a', 'input': 'a.fif', 'output': 'a_out.fif'}])
+    item = Batch.LoadManifest(manifestPath)[0]
+    _MarkDone(manifestPath, item)
+    with open(manifestPath + '.journal', 'a') as journal:
+        journal.write('{"id": "b", "output": "b_out.fi') #crash while writing
+
+    assert Batch.ReadJournal(manifestPath + '.journal') == {'a': Batch.RecordingHash(item)}
+
+def test_skip_on_resume(tmp_path):
+    manifestPath = _WriteManifest(tmp_path, [{'id': 'a', 'input': 'a.fif', 'output': 'a_out.fif'},
+                                             {'id': 'b', 'input': 'b.fif', 'output': 'b_out.fif'}])
+    _MarkDone(manifestPath, Batch.LoadManifest(manifestPath)[0])
+
+    results = {r['id']: r['status'] for r in Batch.RunBatch(manifestPath)}
+    assert results == {'a': 'skipped', 'b': 'failed'}
+
+@pytest.mark.parametrize('change', [{'output': 'a_new.fif'}, {'input': 'a_new.fif'}, {'settings': {'interpolateDPup': False}}])
+def test_changed_recording_is_not_skipped(tmp_path, change):
+    recording = {'id': 'a', 'input': 'a.fif', 'output': 'a_out.fif'}
+    manifestPath = _WriteManifest(tmp_path, [recording])
+    _MarkDone(manifestPath, Batch.LoadManifest(manifestPath)[0])
+
+    recording.update(change)
+    _WriteManifest(tmp_path, [recording])
+    assert Batch.RunBatch(manifestPath)[0]['status'] == 'failed'
+
+def test_no_resume(tmp_path):
+    manifestPath = _WriteManifest(tmp_path, [{'id': 'a', 'input': 'a.fif', 'output': 'a_out.fif'}])
+    _MarkDone(manifestPath, Batch.LoadManifest(manifestPath)[0])
+
+    assert Batch.main([manifestPath]) == 0
+    assert Batch.main([manifestPath, '--no-resume']) == 1
+
+def test_failure_exit_code(tmp_path):
+    manifestPath = _WriteManifest(tmp_path, [{'id': 'a', 'input': 'missing.fif', 'output': 'a_out.fif'}])
+
+    assert Batch.main([manifestPath]) == 1
+    with open(manifestPath + '.journal') as journal:
+        entry = json.loads(journal.readline())
+    assert entry['status'] == 'failed' and entry['error']
+    assert Batch.ReadJournal(manifestPath + '.journal') == {}
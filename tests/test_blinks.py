@@ -0,0 +1,57 @@
+"""Blink handling of the Raw correction loop."""
+import numpy as np
+
+from snipandstitch import _Correction
+
+
+def _StepTrace(slope = 0.0):
+    #one saccade from sample 200 to 220, with a step of 0.5 after it
+    trace = 3.0 + slope * np.arange(1000)
+    trace[200:220] += np.linspace(0, -1, 20)
+    trace[220:] += 0.5
+    return trace
+
+def test_blink_samples_are_interpolated():
+    trace = _StepTrace()
+    trace[500:520] = np.nan
+    trace[700] = np.nan
+    blinkMask = _Correction._BlinkMask(len(trace), [500], [520]) | np.isnan(trace)
+    _Correction._InterpolateBlinks(trace, blinkMask)
+
+    assert not np.isnan(trace).any()
+    np.testing.assert_allclose(trace[499:521], 3.5)
+    assert trace[700] == 3.5
+
+def test_blink_in_median_window():
+    clean = _StepTrace()
+    totalClean = _Correction._SnipStitchTrace(clean, [200], [220], 4)
+
+    #blink samples inside both median windows hold interpolated values that differ from the true pupil size
+    blinked = _StepTrace()
+    blinkMask = _Correction._BlinkMask(len(blinked), [196, 222], [198, 224])
+    blinked[blinkMask] = 10.0
+    totalBlinked = _Correction._SnipStitchTrace(blinked, [200], [220], 4, blinkMask=blinkMask)
+
+    assert totalBlinked == totalClean == 0.5
+
+def test_blink_in_slope_window():
+    clean = _StepTrace(0.001)
+    totalClean = _Correction._SnipStitchTrace(clean, [200], [220], 4, 50, 500.0)
+
+    blinked = _StepTrace(0.001)
+    blinkMask = _Correction._BlinkMask(len(blinked), [160], [175])
+    blinked[blinkMask] = 10.0
+    totalBlinked = _Correction._SnipStitchTrace(blinked, [200], [220], 4, 50, 500.0, blinkMask)
+
+    np.testing.assert_allclose(totalBlinked, totalClean, rtol=0, atol=1e-12)
+
+def test_median_window_all_blink(capsys):
+    trace = _StepTrace()
+    original = trace.copy()
+    blinkMask = _Correction._BlinkMask(len(trace), [220], [224])
+    total = _Correction._SnipStitchTrace(trace, [200], [220], 4, blinkMask=blinkMask)
+
+    #the saccade is neither corrected nor stitched
+    assert total == 0.0
+    np.testing.assert_array_equal(trace, original)
+    assert capsys.readouterr().out.startswith('Warning:')
@@ -0,0 +1,69 @@
+"""Estimation with time-based windows on decimated data."""
+import numpy as np
+import pytest
+
+from snipandstitch import _Correction, _SnipStitch
+
+
+@pytest.mark.parametrize('interpolate', [False, True])
+def test_factor_one_equals_full_rate(makeTrace, interpolate):
+    #at 400 Hz, MEDIAN_DURATION spans MEDIAN_WIDTH samples, so time-based windows equal sample-based windows
+    sfreq = 1000 * _SnipStitch.MEDIAN_WIDTH / _SnipStitch.MEDIAN_DURATION
+    trace, starts, ends = makeTrace(8000, 25)
+
+    expected = _Correction._EstimateSnipStitches(trace, starts, ends, sfreq if interpolate else None)
+    decimated = _Correction._EstimateSnipStitchesDecimated(trace, starts, ends, sfreq, 1, interpolate)
+
+    #bin averages come from a cumulative sum, which adds rounding errors
+    np.testing.assert_allclose(decimated, expected, rtol=0, atol=1e-9)
+
+@pytest.mark.parametrize('factor', [1, 2, 4])
+def test_steps_at_any_factor(rng, factor):
+    #a piecewise constant trace with saccadic artifacts: every factor, including 1, recovers the steps
+    sfreq = 2000.0
+    starts = np.arange(1000, 20000, 1000)
+    ends = starts + 60
+    steps = rng.normal(0, 0.3, len(starts))
+    trace = np.full(21000, 3.0)
+    for start, end, step in zip(starts, ends, steps):
+        trace[end:] += step
+        trace[start:end] += rng.normal(0, 0.5)
+
+    dTot, dPup = _Correction._EstimateSnipStitchesDecimated(trace, starts, ends, sfreq, factor, True)
+
+    np.testing.assert_allclose(dTot, steps, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(dPup, 0, rtol=0, atol=1e-9)
+
+def test_nan_outside_windows(makeTrace):
+    sfreq = 2000.0
+    trace, starts, ends = makeTrace(20000, 10, minGap=500)
+    expected = _Correction._EstimateSnipStitchesDecimated(trace, starts, ends, sfreq, 4, True)
+
+    #a NaN between the windows of the first two saccades only affects the bins that contain it
+    trace[(ends[0] + starts[1]) // 2] = np.nan
+    dTot, dPup = _Correction._EstimateSnipStitchesDecimated(trace, starts, ends, sfreq, 4, True)
+
+    np.testing.assert_array_equal(dTot, expected[0])
+    np.testing.assert_array_equal(dPup, expected[1])
+
+def test_nan_in_window(makeTrace):
+    sfreq = 2000.0
+    trace, starts, ends = makeTrace(20000, 10, minGap=500)
+    trace[ends[3] + 12] = np.nan
+    dTot, _ = _Correction._EstimateSnipStitchesDecimated(trace, starts, ends, sfreq, 4, False)
+
+    assert np.isnan(dTot[3])
+    assert not np.isnan(np.delete(dTot, 3)).any()
+
+@pytest.mark.parametrize('factor', [2, 4, 8])
+def test_error_against_full_rate(makeTrace, factor):
+    #corrections estimated at 1000, 500 and 250 Hz from noisy 2000 Hz data, relative to full-rate estimation, in units of the noise SD
+    sfreq, noise = 2000.0, 0.05
+    trace, starts, ends = makeTrace(200000, 250, minGap=500, noise=noise)
+
+    fullTot, fullPup = _Correction._EstimateSnipStitches(trace, starts, ends, sfreq)
+    dTot, dPup = _Correction._EstimateSnipStitchesDecimated(trace, starts, ends, sfreq, factor, True)
+    error = ((dTot - dPup) - (fullTot - fullPup)) / noise
+
+    assert np.sqrt(np.mean(error ** 2)) < 1.0
+    assert np.abs(error).max() < 4.0
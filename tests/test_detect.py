@@ -0,0 +1,44 @@
+"""Vectorized saccade detection."""
+import numpy as np
+
+from snipandstitch import Functions
+
+
+def _Gaze(rng, nSamples = 5000, nSaccades = 10, sfreq = 500.0, noise = 0.002):
+    """Return x and y gaze positions with smooth saccades between fixations, and the true saccade onsets."""
+    onsets = np.linspace(300, nSamples - 300, nSaccades).astype(int)
+    duration = int(0.03 * sfreq)
+    x = np.zeros(nSamples)
+    y = np.zeros(nSamples)
+    profile = (1 - np.cos(np.linspace(0, np.pi, duration))) / 2
+    for onset in onsets:
+        for position in (x, y):
+            amplitude = rng.uniform(2, 8) * rng.choice([-1, 1])
+            position[onset:onset + duration] += amplitude * profile
+            position[onset + duration:] += amplitude
+    x += noise * rng.standard_normal(nSamples)
+    y += noise * rng.standard_normal(nSamples)
+    return x, y, onsets
+
+def test_detects_saccades(rng):
+    x, y, onsets = _Gaze(rng)
+    starts, ends = Functions.DetectSaccades(x, y, 500.0)
+
+    assert len(starts) == len(onsets)
+    assert np.all(np.abs(starts - onsets) < 10)
+
+def test_quantized_positions(rng):
+    #with 0.01 resolution, more than half of the vertical velocities are zero, so the median-based noise estimate is 0
+    x, y, onsets = _Gaze(rng)
+    y = np.round(y, 2)
+    starts, ends = Functions.DetectSaccades(x, y, 500.0)
+
+    assert len(starts) == len(onsets)
+    assert np.all(np.abs(starts - onsets) < 10)
+    assert np.all(ends - starts < 40)
+
+def test_constant_axis(rng):
+    x, _, onsets = _Gaze(rng)
+    starts, ends = Functions.DetectSaccades(x, np.zeros(len(x)), 500.0)
+
+    assert len(starts) == len(onsets)
@@ -0,0 +1,85 @@
+"""Lazy correction of chunked arrays must equal per-trial Trial correction."""
+import numpy as np
+import pytest
+
+from snipandstitch import Trial, Event, Functions
+
+da = pytest.importorskip('dask.array')
+
+
+def _TrialCorrected(trace, mask, sfreq):
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    events = [Event.Event(int(s), int(e)) for s, e in zip(np.nonzero(edges == 1)[0], np.nonzero(edges == -1)[0])]
+    trialTrace = np.zeros([len(trace), 3])
+    trialTrace[:, 2] = trace
+    trial = Trial.Trial(trialTrace, events, samplingRate=sfreq)
+    return np.array([trial.CorrectedPupsize(i) for i in range(len(trial))])
+
+def _Dataset(makeTrace, nTrials, nSamples):
+    data, masks = [], []
+    for _ in range(nTrials):
+        trace, starts, ends = makeTrace(nSamples, 8)
+        mask = np.zeros(nSamples, dtype=bool)
+        for start, end in zip(starts, ends):
+            mask[start:end] = True
+        data.append(trace)
+        masks.append(mask)
+    return np.array(data).reshape(2, nTrials // 2, nSamples), np.array(masks).reshape(2, nTrials // 2, nSamples)
+
+@pytest.mark.parametrize('interpolateDPup', [False, True])
+def test_lazy_equals_trial(makeTrace, interpolateDPup):
+    sfreq = 500.0
+    data, masks = _Dataset(makeTrace, 4, 3000)
+
+    #small chunks along time, so that saccades cross chunk borders
+    lazy = Functions.SnipAndStitch_Lazy(da.from_array(data, chunks=(1, 2, 400)), masks, sfreq, interpolateDPup=interpolateDPup, maxSaccadeDuration=0.1)
+    corrected = lazy.compute()
+
+    for index in np.ndindex(data.shape[:-1]):
+        expected = _TrialCorrected(data[index], masks[index], sfreq if interpolateDPup else None)
+        np.testing.assert_allclose(corrected[index], expected, rtol=0, atol=1e-10)
+
+def test_lazy_xarray(makeTrace):
+    xr = pytest.importorskip('xarray')
+    data, masks = _Dataset(makeTrace, 2, 3000)
+    array = xr.DataArray(da.from_array(data, chunks=(1, 1, 500)), dims=('participant', 'trial', 'time'))
+
+    lazy = Functions.SnipAndStitch_Lazy(array, masks, 500.0)
+    assert isinstance(lazy, xr.DataArray) and lazy.dims == array.dims
+    np.testing.assert_allclose(lazy.values[1, 0], _TrialCorrected(data[1, 0], masks[1, 0], 500.0), rtol=0, atol=1e-10)
+
+def test_saccade_longer_than_halo_raises(makeTrace):
+    trace, _, _ = makeTrace(2000, 1)
+    mask = np.zeros(2000, dtype=bool)
+    mask[960:1050] = True #90 samples, across the chunk border at 1000
+
+    lazy = Functions.SnipAndStitch_Lazy(da.from_array(trace[None], chunks=(1, 500)), mask[None], 500.0, maxSaccadeDuration=0.02)
+    with pytest.raises(ValueError):
+        lazy.compute()
+
+    #with a long enough halo, the result equals the full trial
+    lazy = Functions.SnipAndStitch_Lazy(da.from_array(trace[None], chunks=(1, 500)), mask[None], 500.0, maxSaccadeDuration=0.2)
+    np.testing.assert_allclose(lazy.compute()[0], _TrialCorrected(trace, mask, 500.0), rtol=0, atol=1e-10)
+
+def test_time_in_one_short_chunk(makeTrace):
+    #epochs of -0.1..0.2 s at 500 Hz are shorter than the halo, and usually chunked only along trials
+    data = np.zeros([4, 151])
+    masks = np.zeros([4, 151], dtype=bool)
+    for i in range(4):
+        trace, starts, ends = makeTrace(151, 1, minGap=55)
+        data[i] = trace
+        masks[i, starts[0]:ends[0]] = True
+
+    lazy = Functions.SnipAndStitch_Lazy(da.from_array(data, chunks=(1, 151)), masks, 500.0)
+    corrected = lazy.compute()
+    for i in range(4):
+        np.testing.assert_allclose(corrected[i], _TrialCorrected(data[i], masks[i], 500.0), rtol=0, atol=1e-10)
+
+def test_time_chunks_smaller_than_halo(makeTrace):
+    data, masks = _Dataset(makeTrace, 2, 3000)
+
+    #the halo is 156 samples, chunks along time are 50 samples
+    lazy = Functions.SnipAndStitch_Lazy(da.from_array(data, chunks=(1, 1, 50)), masks, 500.0)
+    corrected = lazy.compute()
+    for index in np.ndindex(data.shape[:-1]):
+        np.testing.assert_allclose(corrected[index], _TrialCorrected(data[index], masks[index], 500.0), rtol=0, atol=1e-10)
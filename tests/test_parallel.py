@@ -0,0 +1,52 @@
+"""Parallel Raw correction must equal the serial correction."""
+import numpy as np
+import pytest
+
+from snipandstitch import _Correction
+
+
+@pytest.mark.parametrize('interpolateWidth', [None, 50])
+@pytest.mark.parametrize('nJobs', [2, 4])
+def test_parallel_equals_serial(makeTrace, interpolateWidth, nJobs):
+    trace, starts, ends = makeTrace(20000, 60)
+    startIdxs, endIdxs = starts - 1, ends + 1
+
+    serial = trace.copy()
+    serialTotal = _Correction._SnipStitchTrace(serial, startIdxs, endIdxs, 4, interpolateWidth, 500.0)
+    parallel = trace.copy()
+    parallelTotal = _Correction._SnipStitchTraceParallel(parallel, startIdxs, endIdxs, 4, interpolateWidth, 500.0, nJobs=nJobs)
+
+    #the recording must actually be split, otherwise this only tests the serial loop
+    assert len(_Correction._SegmentBounds(startIdxs, endIdxs, len(trace), interpolateWidth or 4, 4)) > nJobs
+    np.testing.assert_allclose(parallel, serial, rtol=0, atol=1e-9)
+    assert parallelTotal == pytest.approx(serialTotal, abs=1e-9)
+
+def test_parallel_equals_serial_with_blinks(makeTrace):
+    trace, starts, ends = makeTrace(20000, 60)
+    startIdxs, endIdxs = starts - 1, ends + 1
+
+    #blinks in the middle of some fixations
+    blinkStarts = (ends[:-1:3] + starts[1::3]) // 2
+    blinkMask = _Correction._BlinkMask(len(trace), blinkStarts, blinkStarts + 20)
+    trace[blinkMask] = np.nan
+    _Correction._InterpolateBlinks(trace, blinkMask)
+
+    serial = trace.copy()
+    _Correction._SnipStitchTrace(serial, startIdxs, endIdxs, 4, 50, 500.0, blinkMask)
+    parallel = trace.copy()
+    _Correction._SnipStitchTraceParallel(parallel, startIdxs, endIdxs, 4, 50, 500.0, nJobs=3, blinkMask=blinkMask)
+
+    assert not np.isnan(serial).any()
+    np.testing.assert_allclose(parallel, serial, rtol=0, atol=1e-9)
+
+def test_overlapping_saccades_are_not_split(makeTrace):
+    #saccades closer together than the estimation windows must stay in one segment
+    _, starts, ends = makeTrace(5000, 10)
+    starts = np.concatenate([starts, starts + 30])
+    ends = np.concatenate([ends, ends + 30])
+    order = np.argsort(starts)
+    segments = _Correction._SegmentBounds(starts[order], ends[order], 5000, 50, 4)
+
+    for sampleStart, sampleEnd, saccStart, saccEnd in segments:
+        assert np.all(starts[order][saccStart:saccEnd] - 50 >= sampleStart)
+        assert np.all(ends[order][saccStart:saccEnd] + 4 <= sampleEnd)
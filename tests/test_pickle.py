@@ -0,0 +1,53 @@
+"""Pickled and copied Trials must correct as the original, and stay editable."""
+import copy
+import pickle
+
+import numpy as np
+import pytest
+
+from snipandstitch import Trial, Event
+
+
+def _Corrected(trial):
+    return np.array([trial.CorrectedPupsize(i) for i in range(len(trial))])
+
+@pytest.fixture
+def trial(makeTrace):
+    trace, starts, ends = makeTrace(3000, 10)
+    trialTrace = np.zeros([len(trace), 3])
+    trialTrace[:, 2] = trace
+    trial = Trial.Trial(trialTrace, [Event.Event(int(s), int(e)) for s, e in zip(starts, ends)], samplingRate=500.0)
+    trial._SetSnipStitchSettings(participantCorrectionValue=0.01)
+    return trial
+
+@pytest.mark.parametrize('roundTrip', [lambda t: pickle.loads(pickle.dumps(t)), copy.deepcopy])
+def test_round_trip(trial, roundTrip):
+    restored = roundTrip(trial)
+
+    np.testing.assert_array_equal(_Corrected(restored), _Corrected(trial))
+    assert restored.residualCorrection == trial.residualCorrection
+    assert [(e.start, e.end) for e in restored.events] == [(e.start, e.end) for e in trial.events]
+
+def test_edit_after_round_trip(trial):
+    restored = pickle.loads(pickle.dumps(trial))
+
+    for t in (trial, restored):
+        t.RemoveEvent(t.events[3])
+        t.ModifyEvent(t.events[5], start=t.events[5].start + 2)
+        t.AddEvent(Event.Event(100, 110))
+
+    np.testing.assert_array_equal(_Corrected(restored), _Corrected(trial))
+
+def test_events_is_a_copy(trial):
+    trial.events.clear()
+    assert trial.eventCount == 10
+
+def test_list_trace_keeps_type(makeTrace):
+    trace, starts, ends = makeTrace(1000, 3)
+    samples = [[0.0, 1.0, value] for value in trace]
+    trial = Trial.Trial(samples, [Event.Event(int(s), int(e)) for s, e in zip(starts, ends)], samplingRate=500.0)
+
+    restored = pickle.loads(pickle.dumps(trial))
+
+    assert restored.Pos(10) == trial.Pos(10) == [0.0, 1.0]
+    np.testing.assert_array_equal(_Corrected(restored), _Corrected(trial))
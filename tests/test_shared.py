@@ -0,0 +1,55 @@
+"""Shared estimation for overlapping epochs must equal per-epoch Trial correction."""
+import numpy as np
+import pytest
+
+from snipandstitch import Trial, Event, _Correction
+
+
+def _Epochs(trace, starts, ends, epochFirsts, nTimes, preWidth):
+    """Cut overlapping epochs from a continuous trace, with the saccades whose windows fit in each epoch."""
+    data = np.stack([trace[first:first + nTimes] for first in epochFirsts])
+    epochIdxs, relStarts, relEnds = [], [], []
+    for i, first in enumerate(epochFirsts):
+        inEpoch = (starts - first - 1 - preWidth >= 0) & (ends - first + 1 + 4 <= nTimes)
+        epochIdxs += [i] * inEpoch.sum()
+        relStarts += list(starts[inEpoch] - first)
+        relEnds += list(ends[inEpoch] - first)
+    return data, np.array(epochIdxs), np.array(relStarts), np.array(relEnds)
+
+@pytest.mark.parametrize('sfreq', [None, 500.0])
+def test_shared_equals_trial(makeTrace, sfreq):
+    trace, starts, ends = makeTrace(12000, 40)
+    nTimes = 1500
+    epochFirsts = np.arange(0, len(trace) - nTimes, 700) #each sample is in up to three epochs
+    preWidth = 50 if sfreq else 4
+    data, epochIdxs, relStarts, relEnds = _Epochs(trace, starts, ends, epochFirsts, nTimes, preWidth)
+
+    dTot, dPup = _Correction._EstimateSharedSnipStitches(data, epochFirsts, epochIdxs, relStarts, relEnds, sfreq)
+    corrValues = dTot - dPup
+
+    for i in range(len(data)):
+        inEpoch = epochIdxs == i
+        shared = _Correction._ApplySnipStitches(data[i], relStarts[inEpoch], relEnds[inEpoch], corrValues[inEpoch], interpolate = sfreq is not None)
+
+        trialTrace = np.zeros([nTimes, 3])
+        trialTrace[:, 2] = data[i]
+        trial = Trial.Trial(trialTrace, [Event.Event(int(s), int(e)) for s, e in zip(relStarts[inEpoch], relEnds[inEpoch])], samplingRate=sfreq)
+        expected = np.array([trial.CorrectedPupsize(j) for j in range(nTimes)])
+
+        np.testing.assert_allclose(shared, expected, rtol=0, atol=1e-12)
+
+def test_shared_estimates_each_saccade_once(makeTrace):
+    trace, starts, ends = makeTrace(6000, 20)
+    nTimes = 1500
+    epochFirsts = np.arange(0, len(trace) - nTimes, 500)
+    data, epochIdxs, relStarts, relEnds = _Epochs(trace, starts, ends, epochFirsts, nTimes, 50)
+
+    dTot, dPup = _Correction._EstimateSharedSnipStitches(data, epochFirsts, epochIdxs, relStarts, relEnds, 500.0)
+
+    #the same saccade seen from different epochs gets the same estimate
+    absStarts = epochFirsts[epochIdxs] + relStarts
+    uniqueStarts, counts = np.unique(absStarts, return_counts=True)
+    assert counts.max() > 1
+    for start in uniqueStarts:
+        same = absStarts == start
+        assert np.ptp(dTot[same]) == 0 and np.ptp(dPup[same]) == 0
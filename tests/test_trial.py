@@ -0,0 +1,86 @@
+"""Trial corrections through the index structure, and incremental event edits."""
+import numpy as np
+import pytest
+
+from snipandstitch import Trial, Event
+
+
+def _MakeTrial(trace, starts, ends, samplingRate = 500.0):
+    trialTrace = np.zeros([len(trace), 3])
+    trialTrace[:, 2] = trace
+    events = [Event.Event(int(start), int(end)) for start, end in zip(starts, ends)]
+    return Trial.Trial(trialTrace, events, samplingRate=samplingRate), events
+
+def _Corrected(trial):
+    return np.array([trial.CorrectedPupsize(i) for i in range(len(trial))])
+
+@pytest.mark.parametrize('samplingRate', [None, 500.0])
+def test_index_equals_snipstitch_loop(makeTrace, samplingRate):
+    trace, starts, ends = makeTrace(3000, 10)
+    trial, _ = _MakeTrial(trace, starts, ends, samplingRate)
+    indexed = _Corrected(trial)
+
+    #without the index, every SnipStitch is applied one after the other
+    trial._ssOrdered = False
+    looped = _Corrected(trial)
+
+    np.testing.assert_allclose(indexed, looped, rtol=0, atol=1e-12)
+
+def test_edits_equal_new_trial(makeTrace):
+    trace, starts, ends = makeTrace(3000, 10)
+    trial, events = _MakeTrial(trace, starts[:-1], ends[:-1])
+    trial.SetInterpolateSlope(False)
+
+    events.append(Event.Event(int(starts[-1]), int(ends[-1])))
+    trial.AddEvent(events[-1])
+    trial.RemoveEvent(events.pop(2))
+    trial.ModifyEvent(events[4], start=int(starts[5]) + 2)
+    trial.ModifyEvent(events[0], end=int(ends[0]) - 3)
+
+    #same events, estimated from scratch
+    newStarts, newEnds = np.delete(starts, 2), np.delete(ends, 2)
+    newStarts[4] += 2
+    newEnds[0] -= 3
+    expected, _ = _MakeTrial(trace, newStarts, newEnds)
+    expected.SetInterpolateSlope(False)
+
+    assert [(e.start, e.end) for e in events] == list(zip(newStarts, newEnds))
+    np.testing.assert_array_equal(_Corrected(trial), _Corrected(expected))
+
+def test_edits_do_not_change_callers_list(makeTrace):
+    trace, starts, ends = makeTrace(3000, 3)
+    events = [Event.Event(int(starts[0]), int(ends[0]))]
+    trial = Trial.Trial(np.stack([np.zeros(len(trace)), np.zeros(len(trace)), trace], axis=1), events)
+
+    trial.AddEvent(Event.Event(int(starts[1]), int(ends[1])))
+    assert len(events) == 1
+    assert trial.eventCount == 2
+
+@pytest.mark.parametrize('start, end', [(None, 5000), (-5, None), (None, 10), (200, 200)])
+def test_invalid_modification_leaves_event_unchanged(makeTrace, start, end):
+    trace, starts, ends = makeTrace(3000, 3)
+    trial, events = _MakeTrial(trace, starts, ends)
+    event = events[1]
+    before = _Corrected(trial)
+
+    with pytest.raises(ValueError):
+        trial.ModifyEvent(event, start=start, end=end)
+
+    assert (event.start, event.end) == (starts[1], ends[1])
+    np.testing.assert_array_equal(_Corrected(trial), before)
+
+@pytest.mark.parametrize('start, end', [(-5, 100), (300, 300), (2990, 3010)])
+def test_invalid_event_is_not_added(makeTrace, start, end):
+    trace, starts, ends = makeTrace(3000, 3)
+    trial, _ = _MakeTrial(trace, starts, ends)
+
+    with pytest.raises(ValueError):
+        trial.AddEvent(Event.Event(start, end))
+    assert trial.eventCount == 3
+
+def test_events_ordered_by_start(makeTrace):
+    trace, starts, ends = makeTrace(3000, 5)
+    order = [3, 0, 4, 1, 2]
+    trial, _ = _MakeTrial(trace, starts[order], ends[order])
+
+    assert [e.start for e in trial.events] == sorted(starts)
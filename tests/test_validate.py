@@ -0,0 +1,63 @@
+"""Validation of all events at once."""
+import numpy as np
+
+from snipandstitch import Functions, _Validate
+
+
+def test_overlap_with_non_adjacent_event():
+    data = np.ones(500)
+    result = Functions.ValidateEvents(data, [100, 120, 150], [300, 130, 160])
+
+    #event 0 spans both later events
+    np.testing.assert_array_equal(result['overlapping'], [True, True, True])
+
+def test_overlap_of_extended_events():
+    #events that touch after extension by EXTEND_EVENTS overlap in the SnipStitch objects
+    data = np.ones(500)
+    result = Functions.ValidateEvents(data, [100, 131, 200], [130, 150, 220])
+
+    np.testing.assert_array_equal(result['overlapping'], [True, True, False])
+
+def test_overlap_only_within_epoch():
+    data = np.ones([3, 500])
+    starts = np.array([100, 120, 100, 150, 300])
+    ends = np.array([300, 130, 140, 160, 310])
+    epochIdx = np.array([0, 1, 1, 1, 2])
+    result = Functions.ValidateEvents(data, starts, ends, epochIdx)
+
+    np.testing.assert_array_equal(result['overlapping'], [False, True, True, False, False])
+    assert result['summary']['overlapping'] == 2
+
+def test_valid_events(makeTrace):
+    trace, starts, ends = makeTrace(5000, 15)
+    result = Functions.ValidateEvents(trace, starts, ends, samplingRate=500.0)
+
+    assert result['summary']['invalid'] == 0
+
+def test_tmin_must_include_extension():
+    #at 500 Hz, the slope window of a saccade at sample 50 starts one sample before the trial, because saccades are extended
+    assert Functions.ValidateEvents(np.ones((1, 151)), [50], [60], [0], 500.0)['summary']['invalid'] == 1
+    assert Functions.ValidateEvents(np.ones((1, 151)), [51], [60], [0], 500.0)['summary']['invalid'] == 0
+
+def test_shared_windows_use_union():
+    #two overlapping epochs of 151 samples, 50 samples apart. The saccade of epoch 1 starts at its sample 20,
+    #so its slope window leaves epoch 1, but lies in epoch 0
+    data = np.ones([2, 151])
+    epochFirsts = np.array([1000, 1050])
+    starts, ends, epochIdx = np.array([70, 20]), np.array([80, 30]), np.array([0, 1])
+
+    perEpoch = _Validate._ValidateEvents(data, starts, ends, epochIdx, samplingRate=500.0)
+    shared = _Validate._ValidateSharedEvents(data, epochFirsts, starts, ends, epochIdx, samplingRate=500.0)
+
+    np.testing.assert_array_equal(perEpoch['outOfWindow'], [False, True])
+    np.testing.assert_array_equal(shared['invalid'], [False, False])
+
+def test_shared_windows_with_estimation_rate():
+    #a NaN 8 samples after the saccade is outside the MEDIAN_WIDTH window, but inside the MEDIAN_DURATION window at 2000 Hz
+    data = np.ones([1, 1000])
+    data[0, 608] = np.nan
+    args = (data, np.array([0]), np.array([500]), np.array([600]), np.array([0]))
+
+    assert _Validate._ValidateSharedEvents(*args)['summary']['nanInWindow'] == 0
+    assert _Validate._ValidateSharedEvents(*args, decimation=4, fullRate=2000.0)['summary']['nanInWindow'] == 1
+    assert _Validate._ValidateSharedEvents(*args, decimation=1, fullRate=2000.0)['summary']['nanInWindow'] == 1